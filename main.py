@@ -1,482 +1,162 @@
 #Desenvolvido por Gustavo Okamoto de Carvalho
 
 import argparse
-import platform
-import subprocess
 import sys
-import os
 import time
-import re # Necessário para o parsing da saída do ping
-from datetime import datetime
+import re
 from pathlib import Path
 
-# --- Bibliotecas para Tickets/E-mail ---
-import smtplib
-from email.message import EmailMessage
-import json
-import random
-import string
-from dotenv import load_dotenv
-
-# Carrega variáveis de ambiente (necessário para SMTP)
-load_dotenv()
-
-try:
-    from rich.console import Console
-    from rich.table import Table
-    from rich.panel import Panel
-    from rich.columns import Columns # Novo para o monitor
-    console = Console()
-except Exception:
-    # Fallback if rich isn't installed
-    class SimpleConsole:
-        def print(self, *a, **k):
-            print(*a)
-    console = SimpleConsole()
-
-ROOT = Path(__file__).resolve().parent
-REPORTS = ROOT / "reports"
-REPORTS.mkdir(exist_ok=True)
-TEMPLATES = ROOT / "templates"
-TICKETS_DB = ROOT / "tickets" / "tickets_db.json"
-TICKETS_DB.parent.mkdir(exist_ok=True)
+from wifipro.common import console, DNS_NAMES, DNS_QTYPES, FLEET_PORT, PROBE_TIMEOUT, PROBE_WORKERS, SPEED_PORT, _parse_span, _parse_when
 
-# ==============================================================================
-# 1. Funções Auxiliares
-# ==============================================================================
-
-def run(cmd, shell=True):
-    """Executa um comando de sistema e retorna o código, stdout e stderr."""
-    try:
-        # Usa shell=False para maior segurança, a menos que o comando exija shell (como `ifconfig || ip a`)
-        res = subprocess.run(cmd, shell=shell, capture_output=True, text=True, check=False, encoding='utf-8')
-        return res.returncode, res.stdout.strip(), res.stderr.strip()
-    except Exception as e:
-        return 1, "", str(e)
+# Ponto de entrada enxuto: cada subcomando vive num módulo do pacote `wifipro/`
+# (com bytecode em cache) e só é importado quando é o comando executado.
 
 # ==============================================================================
-# 2. Funções de Rede (status, ping, speedtest, diagnose, fix)
+# 1. Configuração do Parser (Argumentos de Linha de Comando)
 # ==============================================================================
 
-def cmd_status(args):
-    os_name = platform.system()
-    if os_name == "Windows":
-        code, out, err = run("ipconfig /all")
-    else:
-        # Usa shell=True para o operador OR (||)
-        code, out, err = run("ifconfig || ip a", shell=True) 
-    if code != 0:
-        console.print(f"[red]Erro:[/red] {err}")
-        return code
-    console.print(Panel(out, title=f"Status de Rede ({os_name})"))
-    return 0
-
-def cmd_ping(args):
-    targets = args.targets or ["1.1.1.1", "8.8.8.8", "google.com"]
-    count_flag = "-n" if platform.system() == "Windows" else "-c"
-    for t in targets:
-        console.print(f"[bold]Ping:[/bold] {t}")
-        # Usamos shell=False aqui, pois é um comando simples
-        code, out, err = run([f"ping", count_flag, "4", t], shell=False)
-        if code == 0:
-            console.print(out)
-        else:
-            console.print(f"[red]Falhou:[/red] {err or out}")
-    return 0
-
-def cmd_speedtest(args):
-    # Usa sys.executable para garantir que o speedtest-cli seja executado no ambiente correto
-    code, out, err = run(f"{sys.executable} -m speedtest --simple")
-    if code != 0:
-        console.print("[yellow]Instale o speedtest-cli: pip install speedtest-cli[/yellow]")
-        console.print(f"[red]Erro:[/red] {err or out}")
-        return code
-    console.print(Panel(out, title="Speedtest"))
-    return 0
-
-def cmd_diagnose(args):
-    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    report = REPORTS / f"diagnostico-{ts}.txt"
-    blocks = []
-
-    # OS info
-    blocks.append(f"Sistema: {platform.platform()} | Python: {platform.python_version()}")
-
-    # Status
-    os_name = platform.system()
-    if os_name == "Windows":
-        code, out, err = run("ipconfig /all")
-    else:
-        code, out, err = run("ifconfig || ip a", shell=True)
-    blocks.append("\n=== STATUS DE REDE ===\n" + (out or err))
-
-    # Ping
-    for t in ["1.1.1.1", "8.8.8.8", "google.com"]:
-        count_flag = "-n" if os_name == "Windows" else "-c"
-        code, out, err = run([f"ping", count_flag, "4", t], shell=False)
-        blocks.append(f"\n=== PING {t} ===\n" + (out or err))
-
-    # DNS resolve test
-    code, out, err = run(["nslookup", "google.com"], shell=False)
-    blocks.append("\n=== NSLOOKUP google.com ===\n" + (out or err))
-
-    report.write_text("\n\n".join(blocks), encoding="utf-8")
-    console.print(f"[green]Relatório salvo em:[/green] {report}")
-    return 0
-
-def cmd_fix(args):
-    if platform.system() != "Windows":
-        console.print("[yellow]No momento, 'fix' implementado apenas no Windows.[/yellow]")
-        return 0
-
-    if args.flushdns:
-        console.print("[bold]Executando:[/bold] ipconfig /flushdns")
-        run("ipconfig /flushdns")
-
-    if args.winsock:
-        console.print("[bold]Executando:[/bold] netsh winsock reset (requer reiniciar)")
-        # Isso precisa ser executado com privilégios de administrador
-        run("netsh winsock reset") 
-
-    if not args.flushdns and not args.winsock:
-        console.print("[cyan]Nada a fazer. Use --flushdns e/ou --winsock[/cyan]")
-    else:
-        console.print("[green]Concluído. Reinicie o PC se solicitado.[/green]")
-    return 0
+def _lazy(module, name):
+    """Handler que importa `wifipro.<module>` na primeira chamada e delega para `name`."""
+    def handler(args):
+        import importlib
+        return getattr(importlib.import_module(f"wifipro.{module}"), name)(args)
+    handler.__name__ = name
+    return handler
 
-# ==============================================================================
-# 3. Funções de Monitoramento de Qualidade de Conexão (Novo)
-# ==============================================================================
-
-def _measure_latency(target, count=4):
-    """
-    Mede a latência, perda de pacotes e jitter para um alvo.
-    Retorna (min_lat, avg_lat, max_lat, loss_rate, jitter, code).
-    """
-    ping_command = ["ping"]
-    if platform.system() == "Windows":
-        # -n para count, -w para timeout em milissegundos
-        ping_command += ["-n", str(count), "-w", "1000"] 
-        # O ping do Windows não suporta intervalo rápido, usa o padrão (1 segundo)
-    else:
-        # -c para count, -i para intervalo de 0.2 segundos para ser mais rápido
-        ping_command += ["-c", str(count), "-i", "0.2"] 
-    ping_command.append(target)
-
-    # Usa shell=False para o subprocess.run do ping
-    code, out, err = run(ping_command, shell=False)
-    
-    if code != 0:
-        # Tenta extrair perda de pacotes mesmo em erro
-        loss_match = re.search(r"(\d+)%\s+packet loss", out + err)
-        loss_rate = int(loss_match.group(1)) if loss_match else 100
-        return None, None, None, loss_rate, None, 1
-
-    latencies = []
-    
-    # Simples parsing do output do ping para extrair tempos
-    if platform.system() == "Windows":
-        # Expressão para 'tempo=XXms' (Win)
-        matches = re.findall(r"tempo=(\d+)ms", out)
-        latencies = [int(m) for m in matches]
-    else:
-        # Expressão para 'time=XX.X ms' (Unix)
-        matches = re.findall(r"time=(\d+\.?\d*)\s+ms", out)
-        latencies = [float(m) for m in matches]
-
-    # Tentativa de extrair perda de pacotes da linha de resumo
-    loss_match = re.search(r"(\d+)%\s+packet loss", out)
-    loss_rate = int(loss_match.group(1)) if loss_match else 100
-
-    if not latencies:
-        return None, None, None, loss_rate, None, 1
-
-    min_lat = min(latencies)
-    max_lat = max(latencies)
-    avg_lat = sum(latencies) / len(latencies)
-    
-    # Cálculo do Jitter (variação média entre latências consecutivas)
-    jitter = 0
-    if len(latencies) > 1:
-        # Calcula a diferença absoluta entre latências consecutivas
-        diffs = [abs(latencies[i] - latencies[i-1]) for i in range(1, len(latencies))]
-        # O jitter é a média dessas diferenças
-        jitter = sum(diffs) / len(diffs) if diffs else 0
-        
-    return min_lat, avg_lat, max_lat, loss_rate, jitter, 0
-
-
-def _get_quality_alert(avg_lat, loss_rate, jitter):
-    """Retorna uma string de alerta de qualidade de conexão baseado em limites típicos."""
-    alerts = []
-    
-    # Limites típicos para VoIP/Jogos (valores em milissegundos)
-    LATENCY_LIMIT = 150 # Ruim > 150ms
-    LOSS_LIMIT = 5      # Ruim > 5%
-    JITTER_LIMIT = 30   # Ruim > 30ms
-
-    if loss_rate >= LOSS_LIMIT:
-        alerts.append(f"[bold red]ALERTA: Perda de Pacotes Alta ({loss_rate:.1f}%)![/bold red]")
-    elif loss_rate > 1:
-        alerts.append(f"[yellow]Atenção: Perda de Pacotes Moderada ({loss_rate:.1f}%).[/yellow]")
-
-    if avg_lat >= LATENCY_LIMIT:
-        alerts.append(f"[bold red]ALERTA: Latência Muito Alta ({avg_lat:.1f}ms)![/bold red]")
-    elif avg_lat > 50:
-        alerts.append(f"[yellow]Atenção: Latência Elevada ({avg_lat:.1f}ms).[/yellow]")
-
-    if jitter >= JITTER_LIMIT:
-        alerts.append(f"[bold red]ALERTA: Jitter Extremo ({jitter:.1f}ms)![/bold red]")
-    elif jitter > 10:
-        alerts.append(f"[yellow]Atenção: Jitter Moderado ({jitter:.1f}ms).[/yellow]")
-        
-    if not alerts:
-        alerts.append("[green]Qualidade de Conexão Ótima.[/green]")
-        
-    return " | ".join(alerts)
-
-def cmd_monitor(args):
-    target = args.target or "1.1.1.1"
-    duration = args.duration
-    interval = args.interval
-    
-    console.print(f"[bold blue]Monitorando:[/bold blue] {target} (Intervalo: {interval}s, Duração: {duration}s)")
-    
-    start_time = time.time()
-    
+def _positive_float(value):
+    """Tipo do argparse para intervalos: número de segundos maior que zero."""
     try:
-        while time.time() - start_time < duration:
-            # Medição contínua. 4 pings por medição
-            min_lat, avg_lat, max_lat, loss_rate, jitter, code = _measure_latency(target, count=4)
-            
-            current_ts = datetime.now().strftime('%H:%M:%S')
-
-            if code != 0 or avg_lat is None:
-                # Falhou completamente (target não existe, firewall, etc)
-                console.print(f"[{current_ts}] [red]Falha na Medição para {target}.[/red] Perda: {loss_rate:.1f}%")
-            else:
-                alert_status = _get_quality_alert(avg_lat, loss_rate, jitter)
-                
-                # Exibe a tabela de métricas (usa Columns da rich para um layout limpo)
-                try:
-                    data_panel = Panel(
-                        Columns([
-                            f"[cyan]Latência Média:[/cyan] [bold white]{avg_lat:.1f}ms[/bold white]",
-                            f"[cyan]Jitter:[/cyan] [bold white]{jitter:.1f}ms[/bold white]",
-                            f"[cyan]Perda:[/cyan] [bold white]{loss_rate:.1f}%[/bold white]",
-                        ], equal=True),
-                        title=f"Métricas ({current_ts})",
-                        border_style="blue"
-                    )
-                    console.print(data_panel)
-                except NameError:
-                    # Fallback simples
-                    console.print(f"[{current_ts}] Avg Lat: {avg_lat:.1f}ms | Jitter: {jitter:.1f}ms | Loss: {loss_rate:.1f}%")
-                    
-                # Exibe o alerta de qualidade
-                console.print(alert_status)
-                
-            time.sleep(interval)
-            
-    except KeyboardInterrupt:
-        console.print("\n[bold yellow]Monitoramento encerrado pelo usuário.[/bold yellow]")
-        
-    return 0
-
-
-# ==============================================================================
-# 4. Funções de Tickets (open, list, view)
-# ==============================================================================
-
-def _load_db():
-    if TICKETS_DB.exists():
-        try:
-            return json.loads(TICKETS_DB.read_text(encoding="utf-8"))
-        except Exception:
-            return {"tickets": []}
-    return {"tickets": []}
-
-def _save_db(db):
-    TICKETS_DB.write_text(json.dumps(db, ensure_ascii=False, indent=2), encoding="utf-8")
-
-def _gen_protocol(prefix=None):
-    prefix = prefix or os.getenv("PROTOCOL_PREFIX", "OKA")
-    day = datetime.now().strftime("%Y%m%d") # Formato sem hífens para simplificar
-    suffix = "".join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    return f"{prefix}-{day}-{suffix}"
-
-def _render_template(path, mapping):
-    txt = Path(path).read_text(encoding="utf-8")
-    for k, v in mapping.items():
-        txt = txt.replace("${" + k + "}", str(v))
-    return txt
-
-def _send_email(subject, body, to_addr, from_addr=None, html_body=None):
-    host = os.getenv("SMTP_HOST")
-    port = int(os.getenv("SMTP_PORT", "587"))
-    user = os.getenv("SMTP_USER")
-    pwd  = os.getenv("SMTP_PASS")
-    from_addr = from_addr or os.getenv("SUPPORT_FROM", user or "no-reply@example.com")
-
-    if not (host and port and user and pwd and to_addr):
-        console.print("[yellow]SMTP não configurado corretamente (.env). Pulando envio.[/yellow]")
-        return False
-
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = from_addr
-    msg["To"] = to_addr
-    msg.set_content(body)
-    if html_body:
-        msg.add_alternative(html_body, subtype='html')
-
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"número inválido: {value!r}") from None
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"deve ser maior que zero: {value}")
+    return number
+
+def _when(value):
+    """Tipo do argparse para --since/--until: rejeita no parse; o comando interpreta o texto."""
     try:
-        with smtplib.SMTP(host, port, timeout=10) as s:
-            s.starttls()
-            s.login(user, pwd)
-            s.send_message(msg)
-        return True
-    except Exception as e:
-        console.print(f"[red]Erro ao enviar e-mail:[/red] {e}")
-        return False
-
-
-def cmd_ticket_open(args):
-    company = os.getenv("COMPANY_NAME", "Okamoto Security Labs")
-    protocol = _gen_protocol()
-    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    if not args.client_name or not args.client_email or not args.summary:
-        console.print("[red]--client-name, --client-email e --summary são obrigatórios[/red]")
-        return 2
-
-    # Verifica o mutually exclusive group
-    if args.physical and args.logical:
-        console.print("[red]Use apenas --physical OU --logical, não ambos.[/red]")
-        return 2
-        
-    category = "Físico" if args.physical else "Lógico" # Já garantido que um foi passado
-
-    ticket = {
-        "id": protocol,
-        "client_name": args.client_name,
-        "client_email": args.client_email,
-        "summary": args.summary,
-        "category": category,
-        "created_at": created_at,
-        "status": "Recebido"
-    }
-
-    db = _load_db()
-    db["tickets"].append(ticket)
-    _save_db(db)
-
-    console.print(f"[green]Ticket criado:[/green] {protocol} — {category}")
-
-    if args.no_email:
-        console.print("[cyan]Envio de e-mails desativado (--no-email).[/cyan]")
-        return 0
-
-    # Mapeamento de variáveis para templates
-    mapping = {
-        "PROTOCOL": protocol,
-        "COMPANY_NAME": company,
-        "CLIENT_NAME": args.client_name,
-        "CLIENT_EMAIL": args.client_email,
-        "SUMMARY": args.summary,
-        "CATEGORY": category,
-        "CREATED_AT": created_at,
-    }
-    
-    # 1. E-mail para cliente
-    client_txt = _render_template(TEMPLATES / "email_client.txt", mapping)
-    client_html = None
-    if (TEMPLATES / "email_client.html").exists():
-        client_html = _render_template(TEMPLATES / "email_client.html", mapping)
-        
-    # Extrai o assunto (primeira linha que contenha "Assunto:")
-    first_line_c, _, body_rest_c = client_txt.partition("\n")
-    subject_client = first_line_c.replace("Assunto:", "").strip() if "Assunto:" in first_line_c else f"Protocolo {protocol} Recebido"
-    sent_client = _send_email(subject_client, body_rest_c.strip(), args.client_email, html_body=client_html)
-
-    # 2. E-mail para equipe de suporte
-    support_txt = _render_template(TEMPLATES / "email_support.txt", mapping)
-    support_html = None
-    if (TEMPLATES / "email_support.html").exists():
-        support_html = _render_template(TEMPLATES / "email_support.html", mapping)
-        
-    first_line_s, _, body_rest_s = support_txt.partition("\n")
-    subject_support = first_line_s.replace("Assunto:", "").strip() if "Assunto:" in first_line_s else f"[{protocol}] Novo Chamado ({category})"
-    
-    team = os.getenv("SUPPORT_TEAM_EMAIL")
-    sent_support = False
-    if team:
-        sent_support = _send_email(subject_support, body_rest_s.strip(), team, html_body=support_html)
-
-    console.print(f"[blue]E-mails[/blue] → Cliente: {'OK' if sent_client else 'SKIP/FAIL'} | Equipe: {'OK' if sent_support else 'SKIP/FAIL'}")
-    return 0
-
-def cmd_ticket_list(args):
-    db = _load_db()
-    if not db["tickets"]:
-        console.print("[yellow]Nenhum ticket.[/yellow]")
-        return 0
+        _parse_when(value, None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {value!r} (use AAAA-MM-DD[ HH:MM] ou relativo: 30m, 12h, 7d)") from None
+    return value
+
+def _span(value):
+    """Tipo do argparse para durações como 5m, 1h, 1d."""
     try:
-        table = Table(title="Tickets")
-        for col in ["ID","Cliente","Categoria","Status","Criado em"]:
-            table.add_column(col)
-        for t in db["tickets"]:
-            table.add_row(t["id"], t["client_name"], t["category"], t["status"], t["created_at"])
-        console.print(table)
-    except Exception:
-        # Fallback se rich falhar ou for SimpleConsole
-        for t in db["tickets"]:
-            console.print(f"- {t['id']} | {t['client_name']} | {t['category']} | {t['status']} | {t['created_at']}")
-    return 0
-
-def cmd_ticket_view(args):
-    db = _load_db()
-    tid = args.id
-    for t in db["tickets"]:
-        if t["id"] == tid:
-            console.print(json.dumps(t, ensure_ascii=False, indent=2))
-            return 0
-    console.print("[red]Ticket não encontrado.[/red]")
-    return 1
+        _parse_span(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"intervalo inválido: {value!r} (ex: 30s, 5m, 1h, 1d)") from None
+    return value
 
-# ==============================================================================
-# 5. Configuração do Parser (Argumentos de Linha de Comando)
-# ==============================================================================
+def _add_probe_args(parser):
+    """Opções comuns do motor de sondagem paralela."""
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT, help=f"Tempo máximo por sonda em segundos (padrão: {PROBE_TIMEOUT})")
+    parser.add_argument("--workers", type=int, default=PROBE_WORKERS, help=f"Máximo de sondas simultâneas (padrão: {PROBE_WORKERS})")
 
 def build_parser():
     p = argparse.ArgumentParser(description="Reparador de Wi‑Fi — utilitários de rede")
+    p.add_argument("--profile-startup", action="store_true", help="Mede o custo de importação do comando (python -X importtime)")
+    p.add_argument("--trace", action="store_true", help="Mede subprocessos, banco, SMTP e templates; grava uma linha do tempo Chrome trace e um resumo")
+    p.add_argument("--trace-out", metavar="ARQUIVO", help="Destino do --trace (padrão: reports/trace-<data>.json)")
     sub = p.add_subparsers(dest="cmd")
 
     # --- Comandos de Rede ---
     s1 = sub.add_parser("status", help="Exibe informações de rede")
-    s1.set_defaults(func=cmd_status)
+    s1.set_defaults(func=_lazy("network", "cmd_status"))
 
     s2 = sub.add_parser("ping", help="Ping para destinos comuns")
     s2.add_argument("targets", nargs="*", help="Alvos (ex: 1.1.1.1 8.8.8.8)")
-    s2.set_defaults(func=cmd_ping)
-
-    s3 = sub.add_parser("speedtest", help="Executa speedtest-cli (requer instalação)")
-    s3.set_defaults(func=cmd_speedtest)
+    _add_probe_args(s2)
+    s2.set_defaults(func=_lazy("network", "cmd_ping"))
+
+    s3 = sub.add_parser("speedtest", help="Teste de vazão: speedtest-cli (internet) ou servidor próprio (run/serve)")
+    s3.set_defaults(func=_lazy("speedtest", "cmd_speedtest"))
+    s3sub = s3.add_subparsers(dest="speed_cmd")
+
+    s3_run = s3sub.add_parser("run", help="Mede download/upload contra um 'speedtest serve'")
+    s3_run.add_argument("server", help=f"Servidor (host ou host:porta, porta padrão {SPEED_PORT})")
+    s3_run.add_argument("--streams", type=int, default=4, help="Conexões TCP paralelas (padrão: 4)")
+    s3_run.add_argument("--duration", type=int, default=10, help="Duração de cada teste em segundos (padrão: 10)")
+    s3_run.add_argument("--direction", choices=["download", "upload", "both"], default="both", help="Sentido do teste (padrão: both)")
+    s3_run.add_argument("--scale", action="store_true", help="Repete com 1, 2, 4... até --streams conexões")
+    s3_run.set_defaults(func=_lazy("speedtest", "cmd_speedtest_run"))
+
+    s3_serve = s3sub.add_parser("serve", help="Servidor de vazão para testar LAN/Wi-Fi localmente")
+    s3_serve.add_argument("--bind", default="0.0.0.0", help="Endereço de escuta (padrão: 0.0.0.0)")
+    s3_serve.add_argument("--port", type=int, default=SPEED_PORT, help=f"Porta (padrão: {SPEED_PORT})")
+    s3_serve.set_defaults(func=_lazy("speedtest", "cmd_speedtest_serve"))
+
+    s_dns = sub.add_parser("dns", help="Benchmark de resolução DNS (frio x quente) em vários resolvedores")
+    s_dns.add_argument("names", nargs="*", help=f"Nomes a resolver (padrão: {' '.join(DNS_NAMES)})")
+    s_dns.add_argument("--resolvers", nargs="+", help="Resolvedores (ip ou ip:porta; padrão: do sistema + 1.1.1.1 8.8.8.8 9.9.9.9)")
+    s_dns.add_argument("--rounds", type=int, default=3, help="Rodadas quentes após a fria (padrão: 3)")
+    s_dns.add_argument("--timeout", type=float, default=2.0, help="Tempo máximo por consulta em segundos (padrão: 2)")
+    s_dns.add_argument("--type", choices=sorted(DNS_QTYPES), default="A", help="Tipo de registro (padrão: A)")
+    s_dns.set_defaults(func=_lazy("dns", "cmd_dns"))
 
     s4 = sub.add_parser("diagnose", help="Gera relatório de diagnóstico")
-    s4.set_defaults(func=cmd_diagnose)
+    _add_probe_args(s4)
+    s4.set_defaults(func=_lazy("network", "cmd_diagnose"))
+
+    r = sub.add_parser("report", help="Consultas sobre os relatórios estruturados (.jsonl)")
+    rsub = r.add_subparsers(dest="report_cmd")
+    r_query = rsub.add_parser("query", help="Agrega um campo de todos os relatórios do período")
+    r_query.add_argument("--section", choices=["ping", "dns", "status"], default="ping", help="Seção do relatório (padrão: ping)")
+    r_query.add_argument("--metric", choices=["rtt", "loss", "elapsed"], default="rtt", help="Campo agregado (padrão: rtt)")
+    r_query.add_argument("--agg", choices=["count", "mean", "median", "p95", "min", "max"], default="median", help="Agregação (padrão: median)")
+    r_query.add_argument("--target", help="Filtra por alvo do ping / nome consultado no DNS ('gateway' = gateway da rede em cada relatório)")
+    r_query.add_argument("--by-target", action="store_true", help="Um resultado por alvo")
+    r_query.add_argument("--since", type=_when, help="Início: AAAA-MM-DD[ HH:MM] ou relativo (ex: 7d)")
+    r_query.add_argument("--until", type=_when, help="Fim: AAAA-MM-DD[ HH:MM] ou relativo (padrão: agora)")
+    r_query.set_defaults(func=_lazy("network", "cmd_report_query"))
 
     s5 = sub.add_parser("fix", help="Ações de reparo (Windows)")
     s5.add_argument("--flushdns", action="store_true", help="Executa ipconfig /flushdns")
     s5.add_argument("--winsock", action="store_true", help="Executa netsh winsock reset")
-    s5.set_defaults(func=cmd_fix)
+    s5.set_defaults(func=_lazy("network", "cmd_fix"))
+
+    f = sub.add_parser("fleet", help="Diagnóstico de vários hosts a partir de um controlador")
+    fsub = f.add_subparsers(dest="fleet_cmd")
+
+    f_diag = fsub.add_parser("diagnose", help="Diagnostica todos os hosts do inventário em paralelo")
+    f_diag.add_argument("inventory", help="Arquivo com um host por linha: 'nome alvo' (alvo http:// = agente)")
+    f_diag.add_argument("--timeout", type=float, default=PROBE_TIMEOUT, help=f"Tempo máximo por host em segundos (padrão: {PROBE_TIMEOUT})")
+    f_diag.add_argument("--workers", type=int, default=32, help="Hosts diagnosticados ao mesmo tempo (padrão: 32)")
+    f_diag.add_argument("--token", help="Token enviado aos agentes (X-Fleet-Token)")
+    f_diag.set_defaults(func=_lazy("fleet", "cmd_fleet_diagnose"))
+
+    f_agent = fsub.add_parser("agent", help="Expõe o diagnóstico local via HTTP para o controlador")
+    f_agent.add_argument("--bind", default="127.0.0.1", help="Endereço de escuta (padrão: 127.0.0.1)")
+    f_agent.add_argument("--port", type=int, default=FLEET_PORT, help=f"Porta (padrão: {FLEET_PORT})")
+    f_agent.add_argument("--token", help="Exige este token no cabeçalho X-Fleet-Token")
+    _add_probe_args(f_agent)
+    f_agent.set_defaults(func=_lazy("fleet", "cmd_fleet_agent"))
 
     # --- NOVO: Monitoramento em Tempo Real ---
     s6 = sub.add_parser("monitor", help="Mede latência, jitter e perda de pacotes em tempo real.")
-    s6.add_argument("target", nargs="?", default="1.1.1.1", help="Alvo para monitorar (padrão: 1.1.1.1)")
+    s6.add_argument("targets", nargs="*", help="Alvos para monitorar, cada um em ritmo próprio; 'gateway' = gateway padrão (padrão: 1.1.1.1)")
     s6.add_argument("--duration", type=int, default=60, help="Duração total do monitoramento em segundos (padrão: 60)")
-    s6.add_argument("--interval", type=int, default=5, help="Intervalo entre as medições em segundos (padrão: 5)")
-    s6.set_defaults(func=cmd_monitor)
+    s6.add_argument("--interval", type=_positive_float, default=5, help="Intervalo entre as medições em segundos (padrão: 5)")
+    s6.add_argument("--adaptive", action="store_true", help="Espaça as medições com o link saudável e entra em rajada ao degradar")
+    s6.add_argument("--max-interval", type=_positive_float, default=60, help="Intervalo máximo do --adaptive com o link saudável (padrão: 60)")
+    s6.add_argument("--burst-interval", type=_positive_float, default=0.5, help="Intervalo das medições em rajada do --adaptive (padrão: 0.5)")
+    s6.add_argument("--method", choices=["native", "ping"], default="native", help="Sonda nativa em processo ou binário ping do sistema (padrão: native)")
+    s6.add_argument("--workers", type=int, default=PROBE_WORKERS * 8, help=f"Máximo de medições simultâneas (padrão: {PROBE_WORKERS * 8})")
+    s6.add_argument("--live", action="store_true", help="Painel único atualizado no lugar (uma linha por alvo, com sparkline)")
+    s6.add_argument("--refresh", type=_positive_float, default=4, help="Quadros por segundo do --live (padrão: 4)")
+    s6.add_argument("--serve-metrics", metavar="[HOST:]PORTA", help="Expõe /metrics no formato Prometheus (ex: 9108 ou 0.0.0.0:9108)")
+    s6.add_argument("--statsd", metavar="HOST[:PORTA]", help="Envia as amostras a um StatsD via UDP (porta padrão 8125)")
+    s6.add_argument("--record", action="store_true", help="Grava as amostras em samples/ (consulte com 'history')")
+    s6.set_defaults(func=_lazy("monitor", "cmd_monitor"))
+
+    s7 = sub.add_parser("history", help="Consulta amostras gravadas pelo monitor --record")
+    s7.add_argument("target", nargs="?", help="Alvo monitorado")
+    s7.add_argument("--since", type=_when, help="Início: AAAA-MM-DD[ HH:MM] ou relativo (ex: 7d, 12h; padrão: 24h)")
+    s7.add_argument("--until", type=_when, help="Fim: AAAA-MM-DD[ HH:MM] ou relativo (padrão: agora)")
+    s7.add_argument("--bucket", type=_span, help="Agrega por faixa de tempo (ex: 5m, 1h, 1d)")
+    s7.add_argument("--list", action="store_true", help="Lista os alvos com amostras gravadas")
+    s7.set_defaults(func=_lazy("storage", "cmd_history"))
 
     # --- Comandos de Tickets ---
     t = sub.add_parser("ticket", help="Gerenciar tickets (abertura, listagem, visualização)")
@@ -491,28 +171,87 @@ def build_parser():
     grp.add_argument("--physical", action="store_true", help="Problema físico (cabo/porta/fonte)")
     grp.add_argument("--logical", action="store_true", help="Problema lógico (config/DNS/etc.)")
     t_open.add_argument("--no-email", action="store_true", help="Não enviar e-mails (apenas grava no DB)")
-    t_open.set_defaults(func=cmd_ticket_open)
+    t_open.add_argument("--send-now", action="store_true", help="Envia os e-mails já, sem esperar o mail-worker")
+    t_open.set_defaults(func=_lazy("tickets", "cmd_ticket_open"))
 
     t_list = tsub.add_parser("list", help="Lista tickets")
-    t_list.set_defaults(func=cmd_ticket_list)
+    t_list.add_argument("--status", help="Filtra por status (ex: Recebido)")
+    t_list.add_argument("--category", help="Filtra por categoria (Físico/Lógico)")
+    t_list.add_argument("--since", type=_when, help="Criados a partir de AAAA-MM-DD[ HH:MM] ou relativo (ex: 7d)")
+    t_list.add_argument("--client", help="E-mail exato ou parte do nome do cliente")
+    t_list.add_argument("--limit", type=int, help="Máximo de linhas (padrão: 50 na tabela, todas em --format)")
+    t_list.add_argument("--offset", type=int, default=0, help="Pula as N primeiras linhas")
+    t_list.add_argument("--cursor", help="Continua após este id (paginação por chave)")
+    t_list.add_argument("--format", choices=["jsonl", "csv"], help="Saída em streaming, linha a linha")
+    t_list.set_defaults(func=_lazy("tickets", "cmd_ticket_list"))
 
     t_view = tsub.add_parser("view", help="Mostra um ticket específico")
     t_view.add_argument("--id", required=True, help="ID/Protocolo do ticket")
-    t_view.set_defaults(func=cmd_ticket_view)
+    t_view.set_defaults(func=_lazy("tickets", "cmd_ticket_view"))
+
+    t_mail = tsub.add_parser("mail-worker", help="Envia a fila de e-mails reaproveitando uma conexão SMTP")
+    t_mail.add_argument("--once", action="store_true", help="Esvazia a fila uma vez e sai")
+    t_mail.add_argument("--batch", type=int, default=100, help="Mensagens reservadas por vez (padrão: 100)")
+    t_mail.add_argument("--poll", type=float, default=5, help="Intervalo entre varreduras da fila em segundos (padrão: 5)")
+    t_mail.set_defaults(func=_lazy("tickets", "cmd_ticket_mail_worker"))
+
+    t_import = tsub.add_parser("import", help="Importa tickets do antigo tickets_db.json")
+    t_import.add_argument("--path", help="Arquivo JSON de origem (padrão: tickets/tickets_db.json)")
+    t_import.set_defaults(func=_lazy("tickets", "cmd_ticket_import"))
+
+    # --- Benchmarks ---
+    b = sub.add_parser("bench", help="Mede os caminhos quentes e compara com a baseline salva")
+    b.add_argument("--sizes", default="10000,100000,1000000", help="Tamanhos das bases sintéticas de tickets (padrão: 10000,100000,1000000)")
+    b.add_argument("--save", action="store_true", help="Grava os resultados como nova baseline")
+    b.add_argument("--baseline", help="Arquivo de baseline (padrão: bench_baseline.json)")
+    b.add_argument("--tolerance", type=float, default=0.3, help="Piora relativa aceita antes de acusar regressão (padrão: 0.3)")
+    b.set_defaults(func=_lazy("bench", "cmd_bench"))
 
     return p
 
+
 # ==============================================================================
-# 6. Ponto de Entrada
+# 2. Ponto de Entrada
 # ==============================================================================
 
+def _profile_startup(argv):
+    """Reexecuta o comando com `python -X importtime` e resume o custo de importação por módulo."""
+    import subprocess
+    t0 = time.perf_counter()
+    res = subprocess.run([sys.executable, "-X", "importtime", str(Path(__file__).resolve()), *argv],
+                         capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - t0) * 1000
+
+    sys.stdout.write(res.stdout)
+    top, total = [], 0
+    for line in res.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)", line)
+        if not m:
+            if not line.startswith("import time:"):
+                sys.stderr.write(line + "\n")
+            continue
+        if len(m.group(3)) == 1:  # importação de primeiro nível
+            total += int(m.group(2))
+            top.append((int(m.group(2)), m.group(4)))
+
+    top.sort(reverse=True)
+    console.print(f"[bold]Startup:[/bold] {wall_ms:.0f}ms no total, {total / 1000:.1f}ms em importações")
+    for cumulative, name in top[:15]:
+        console.print(f"  {cumulative / 1000:7.1f}ms  {name}")
+    return res.returncode
+
 def main():
+    if "--profile-startup" in sys.argv[1:]:
+        sys.exit(_profile_startup([a for a in sys.argv[1:] if a != "--profile-startup"]))
     parser = build_parser()
     args = parser.parse_args()
     if not hasattr(args, "func"):
         parser.print_help()
         sys.exit(1)
-    sys.exit(args.func(args))
+    if not args.trace:
+        sys.exit(args.func(args))
+    from wifipro.trace import run_traced
+    sys.exit(run_traced(args))
 
 if __name__ == "__main__":
     main()
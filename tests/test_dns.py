@@ -0,0 +1,122 @@
+"""Benchmark de DNS contra um resolvedor de teste em loopback (lento na 1ª vez, NXDOMAIN e descarte)."""
+
+import asyncio
+import socket
+import struct
+import threading
+import unittest
+
+from wifipro.common import _split_hostport
+from wifipro.dns import _dns_bench, _dns_parse_header, _dns_query_packet
+
+SLOW_FIRST = 0.3  # segundos: "slow.test" só é lento na primeira consulta (cache frio)
+
+
+def _qname(packet):
+    labels, pos = [], 12
+    while packet[pos]:
+        labels.append(packet[pos + 1:pos + 1 + packet[pos]].decode())
+        pos += 1 + packet[pos]
+    return ".".join(labels)
+
+
+class _StubResolver:
+    """
+    Resolvedor UDP de mentira: "nx.*" → NXDOMAIN, "drop.*" → sem resposta,
+    "slow.*" → atrasa a primeira resposta, demais → uma resposta imediata.
+    """
+
+    def __init__(self, family=socket.AF_INET, host="127.0.0.1"):
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.bind((host, 0))
+        self.port = self.sock.getsockname()[1]
+        self.seen = set()
+        self.lock = threading.Lock()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except OSError:
+                return
+            name = _qname(data)
+            if name.startswith("drop."):
+                continue
+            rcode, ancount = (3, 0) if name.startswith("nx.") else (0, 1)
+            reply = struct.pack("!HHHHHH", struct.unpack("!H", data[:2])[0], 0x8180 | rcode, 1, ancount, 0, 0) + data[12:]
+            with self.lock:
+                first = name not in self.seen
+                self.seen.add(name)
+            if name.startswith("slow.") and first:
+                threading.Timer(SLOW_FIRST, self._send, (reply, addr)).start()
+            else:
+                self._send(reply, addr)
+
+    def _send(self, reply, addr):
+        try:
+            self.sock.sendto(reply, addr)
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+class DnsBenchTest(unittest.TestCase):
+
+    NAMES = ["ok.test", "slow.test", "nx.test", "drop.test"]
+
+    def bench(self, resolver, rounds=2, timeout=0.5):
+        return asyncio.run(_dns_bench([resolver], self.NAMES, rounds=rounds, timeout=timeout))[resolver]
+
+    def test_slow_first_nxdomain_and_drop(self):
+        server = _StubResolver()
+        self.addCleanup(server.close)
+        res = self.bench(f"127.0.0.1:{server.port}")
+        self.assertEqual(res["queries"], 4 * 3)
+        self.assertEqual(res["timeouts"], 3)   # drop.test em todas as rodadas
+        self.assertEqual(res["nxdomain"], 3)   # nx.test em todas as rodadas
+        self.assertEqual(res["errors"], 0)
+        self.assertEqual(len(res["cold"]), 3)  # respondidas na rodada fria (ok, slow, nx)
+        self.assertEqual(len(res["warm"]), 6)
+        self.assertGreaterEqual(max(res["cold"]), SLOW_FIRST * 1000 * 0.9)
+        self.assertLess(max(res["warm"]), SLOW_FIRST * 1000 * 0.9)
+
+    def test_ipv6_resolver_with_port(self):
+        try:
+            server = _StubResolver(socket.AF_INET6, "::1")
+        except OSError:
+            self.skipTest("sem IPv6 em loopback")
+        self.addCleanup(server.close)
+        res = self.bench(f"[::1]:{server.port}", rounds=1)
+        self.assertEqual(res["queries"], 8)
+        self.assertEqual(res["timeouts"], 2)
+        self.assertEqual(res["nxdomain"], 2)
+
+    def test_query_packet_roundtrip(self):
+        packet = _dns_query_packet(0x1234, "exemplo.com.br.", qtype=28)
+        self.assertEqual(_qname(packet), "exemplo.com.br")
+        self.assertEqual(packet[-4:], struct.pack("!HH", 28, 1))
+        self.assertEqual(_dns_parse_header(packet), (0x1234, 0, 0))
+
+
+class SplitHostPortTest(unittest.TestCase):
+
+    def test_forms(self):
+        cases = {
+            "1.1.1.1": ("1.1.1.1", 53),
+            "1.1.1.1:5353": ("1.1.1.1", 5353),
+            "dns.google:853": ("dns.google", 853),
+            "[::1]:5353": ("::1", 5353),
+            "[::1]": ("::1", 53),
+            "::1": ("::1", 53),
+            "2606:4700:4700::1111": ("2606:4700:4700::1111", 53),
+        }
+        for value, expected in cases.items():
+            with self.subTest(value):
+                self.assertEqual(_split_hostport(value, 53), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""`fleet diagnose` contra agentes em loopback, um host sondado direto, uma porta recusada e um listener travado."""
+
+import argparse
+import re
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from wifipro import fleet
+
+TOKEN = "segredo-de-teste"
+# O diagnóstico do agente fica em loopback: o teste não sai da máquina
+AGENT_BLOCKS = ["Sistema: teste", "\n=== PING 127.0.0.1 ===\nresposta de 127.0.0.1"]
+
+
+def _start_agent(cleanup):
+    """Sobe o servidor do `fleet agent` numa porta livre de loopback e retorna a URL base."""
+    args = argparse.Namespace(bind="127.0.0.1", port=0, token=TOKEN, workers=1, timeout=1.0)
+    server = fleet._fleet_server(args)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+    cleanup(stop)
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+class FleetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        for patch in (mock.patch.object(fleet, "_diagnose_blocks", lambda workers, timeout: AGENT_BLOCKS),
+                      mock.patch.object(fleet, "console", mock.Mock())):
+            patch.start()
+            cls.addClassCleanup(patch.stop)
+        cls.agents = [_start_agent(cls.addClassCleanup) for _ in range(2)]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        patch = mock.patch.object(fleet, "REPORTS", self.tmp / "reports")
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.refused = f"http://127.0.0.1:{s.getsockname()[1]}"
+        # Aceita a conexão no backlog mas nunca responde
+        hung = socket.socket()
+        hung.bind(("127.0.0.1", 0))
+        hung.listen(8)
+        self.addCleanup(hung.close)
+        self.hung = f"http://127.0.0.1:{hung.getsockname()[1]}"
+
+    def run_fleet(self, lines, timeout=3.0, token=TOKEN):
+        inventory = self.tmp / "inventario.txt"
+        inventory.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        args = argparse.Namespace(inventory=str(inventory), timeout=timeout, workers=8, token=token)
+        t0 = time.monotonic()
+        code = fleet.cmd_fleet_diagnose(args)
+        elapsed = time.monotonic() - t0
+        report = next((self.tmp / "reports").glob("frota-*.txt")).read_text(encoding="utf-8")
+        return code, report, elapsed
+
+    def test_agent_probe(self):
+        self.assertEqual(fleet._fleet_probe(self.agents[0], 5.0, TOKEN), AGENT_BLOCKS)
+
+    def test_direct_host_probe(self):
+        blocks = fleet._fleet_probe("127.0.0.1", 1.0)
+        self.assertIn("127.0.0.1", blocks[0])
+        self.assertRegex(blocks[1], r"Latência \((icmp|tcp)\): mín")
+
+    def test_agent_rejects_wrong_token(self):
+        with self.assertRaisesRegex(Exception, "403"):
+            fleet._fleet_probe(self.agents[0], 5.0, "outro")
+
+    def test_mixed_inventory(self):
+        code, report, elapsed = self.run_fleet([
+            "# comentário",
+            f"a1 {self.agents[0]}",
+            f"a2 {self.agents[1]}  # outro agente",
+            "local 127.0.0.1",
+            f"recusado {self.refused}",
+            f"travado {self.hung}",
+        ])
+        self.assertEqual(code, 1)
+        self.assertIn("5 host(s)", report)
+        self.assertRegex(report, rf"##### a1 \({re.escape(self.agents[0])}\) — OK")
+        self.assertRegex(report, rf"##### a2 \({re.escape(self.agents[1])}\) — OK")
+        self.assertRegex(report, r"##### local \(127\.0\.0\.1\) — OK")
+        self.assertRegex(report, r"Latência \((icmp|tcp)\): mín")
+        self.assertIn("resposta de 127.0.0.1", report)
+        self.assertRegex(report, r"##### recusado \(.*\) — FALHA: .*refused")
+        self.assertRegex(report, r"##### travado \(.*\) — FALHA: .*timed out")
+        # Em paralelo: o host travado custa um timeout, não a soma de todos
+        self.assertLess(elapsed, 3.0 + 2.5)
+
+    def test_all_agents_ok(self):
+        code, report, _ = self.run_fleet([f"a{i} {url}" for i, url in enumerate(self.agents)])
+        self.assertEqual(code, 0)
+        self.assertEqual(report.count("— OK —"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+"""Fila de e-mails contra um servidor SMTP de teste em loopback."""
+
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from wifipro import mail, tickets
+
+
+class _StubSmtp(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo: conta conexões e mensagens e recusa os destinatários de `refuse`."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)
+        self.connections = 0
+        self.messages = []
+        self.commands = []
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _StubSmtpHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _StubSmtpHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stub")
+        rcpt, data = None, None
+        for raw in self.rfile:
+            line = raw.decode().rstrip("\r\n")
+            if data is not None:
+                if line == ".":
+                    with server.lock:
+                        server.messages.append((rcpt, "\n".join(data)))
+                    data = None
+                    self.reply("250 queued")
+                else:
+                    data.append(line)
+                continue
+            verb = line.split(" ", 1)[0].upper()
+            with server.lock:
+                server.commands.append(verb)
+            if verb == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                self.reply("235 ok")
+            elif verb == "RCPT":
+                rcpt = line.split(":", 1)[1].strip(" <>")
+                self.reply("550 no such user" if rcpt in server.refuse else "250 ok")
+            elif verb == "DATA":
+                data = []
+                self.reply("354 go")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class MailQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patch in (mock.patch.object(tickets, "TICKETS_SQLITE", Path(tmp.name) / "tickets.db"),
+                      mock.patch.object(tickets, "TICKETS_DB", Path(tmp.name) / "tickets_db.json"),
+                      mock.patch.object(mail, "console", mock.Mock())):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.conn = tickets._db()
+        self.addCleanup(self.conn.close)
+
+    def use_server(self, port, **env):
+        values = {"SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(port), "SMTP_STARTTLS": "0",
+                  "SUPPORT_FROM": "suporte@example.com", **env}
+        patch = mock.patch.dict(os.environ, values)
+        patch.start()
+        self.addCleanup(patch.stop)
+        for key in ("SMTP_USER", "SMTP_PASS"):
+            if key not in env:
+                os.environ.pop(key, None)
+
+    def start_stub(self, refuse=()):
+        server = _StubSmtp(refuse)
+        self.addCleanup(server.stop)
+        self.use_server(server.port)
+        return server
+
+    def enqueue(self, n, to=lambda i: f"cliente{i}@example.com"):
+        for i in range(n):
+            self.assertTrue(mail._enqueue_mail(self.conn, f"P{i:03d}", "client", to(i), f"Assunto {i}", "corpo"))
+
+    def statuses(self):
+        return {r["protocol"]: (r["status"], r["attempts"]) for r in self.conn.execute("SELECT * FROM mail_queue")}
+
+    def test_one_connection_for_the_whole_queue(self):
+        server = self.start_stub()
+        self.enqueue(12)
+        self.assertEqual(mail._deliver_mail_queue(self.conn, batch=5), (12, 0, 0))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 12)
+        self.assertEqual(set(self.statuses().values()), {("sent", 1)})
+        self.assertNotIn("AUTH", server.commands)  # sem SMTP_USER/SMTP_PASS não há login
+
+    def test_login_when_credentials_are_set(self):
+        server = _StubSmtp()
+        self.addCleanup(server.stop)
+        self.use_server(server.port, SMTP_USER="user", SMTP_PASS="secret")
+        self.enqueue(2)
+        self.assertEqual(mail._deliver_mail_queue(self.conn), (2, 0, 0))
+        self.assertEqual(server.commands.count("AUTH"), 1)
+
+    def test_dedup_per_protocol_and_kind(self):
+        self.assertTrue(mail._enqueue_mail(self.conn, "P001", "client", "a@example.com", "s", "b"))
+        self.assertFalse(mail._enqueue_mail(self.conn, "P001", "client", "a@example.com", "s", "b"))
+        self.assertTrue(mail._enqueue_mail(self.conn, "P001", "support", "suporte@example.com", "s", "b"))
+        self.assertTrue(mail._enqueue_mail(self.conn, "P002", "client", "a@example.com", "s", "b"))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM mail_queue").fetchone()[0], 3)
+
+    def test_refused_recipient_backs_off_and_keeps_session(self):
+        server = self.start_stub(refuse={"cliente1@example.com"})
+        self.enqueue(3)
+        before = time.time()
+        self.assertEqual(mail._deliver_mail_queue(self.conn), (2, 1, 0))
+        self.assertEqual(server.connections, 1)
+        row = self.conn.execute("SELECT * FROM mail_queue WHERE protocol = 'P001'").fetchone()
+        self.assertEqual((row["status"], row["attempts"]), ("pending", 1))
+        self.assertGreaterEqual(row["next_attempt_at"], before + mail.MAIL_BACKOFF)
+        self.assertIn("550", row["last_error"])
+
+        # Ainda não venceu: nada a enviar. Vencido, o backoff dobra a cada falha
+        self.assertEqual(mail._deliver_mail_queue(self.conn), (0, 0, 0))
+        self.conn.execute("UPDATE mail_queue SET next_attempt_at = 0 WHERE protocol = 'P001'")
+        self.conn.commit()
+        before = time.time()
+        self.assertEqual(mail._deliver_mail_queue(self.conn), (0, 1, 0))
+        row = self.conn.execute("SELECT * FROM mail_queue WHERE protocol = 'P001'").fetchone()
+        self.assertEqual(row["attempts"], 2)
+        self.assertGreaterEqual(row["next_attempt_at"], before + 2 * mail.MAIL_BACKOFF)
+
+    def test_dropped_after_max_attempts(self):
+        self.start_stub(refuse={"cliente0@example.com"})
+        self.enqueue(1)
+        self.conn.execute("UPDATE mail_queue SET attempts = ?", (mail.MAIL_MAX_ATTEMPTS - 1,))
+        self.conn.commit()
+        self.assertEqual(mail._deliver_mail_queue(self.conn), (0, 0, 1))
+        self.assertEqual(self.statuses()["P000"], ("failed", mail.MAIL_MAX_ATTEMPTS))
+
+    def test_unreachable_server_stops_the_batch(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.use_server(port)
+        self.enqueue(20)
+        t0 = time.monotonic()
+        self.assertEqual(mail._deliver_mail_queue(self.conn), (0, 20, 0))
+        self.assertLess(time.monotonic() - t0, 5)
+        statuses = self.statuses()
+        self.assertEqual(statuses.pop("P000"), ("pending", 1))
+        self.assertEqual(set(statuses.values()), {("pending", 0)})
+
+
+class TicketSchemaTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "tickets.db"
+        for patch in (mock.patch.object(tickets, "TICKETS_SQLITE", self.path),
+                      mock.patch.object(tickets, "TICKETS_DB", Path(tmp.name) / "tickets_db.json"),
+                      mock.patch.object(tickets, "console", mock.Mock())):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def indexes(self, conn):
+        return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")}
+
+    def test_legacy_database_is_migrated_once(self):
+        import sqlite3
+        with sqlite3.connect(self.path) as old:
+            old.execute("CREATE TABLE tickets (id TEXT PRIMARY KEY, client_name TEXT NOT NULL, client_email TEXT NOT NULL,"
+                        " summary TEXT NOT NULL, category TEXT NOT NULL, created_at TEXT NOT NULL, status TEXT NOT NULL)")
+            old.execute("CREATE INDEX idx_tickets_email ON tickets(client_email)")
+        old.close()
+        conn = tickets._db()
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], tickets.SCHEMA_VERSION)
+        self.assertNotIn("idx_tickets_email", self.indexes(conn))
+        self.assertIn("idx_tickets_email_created", self.indexes(conn))
+        # Banco já na versão atual: abrir de novo não reexecuta o esquema
+        conn.execute("CREATE INDEX idx_tickets_email ON tickets(client_email)")
+        conn.commit()
+        with mock.patch.object(tickets, "TICKETS_SCHEMA", "SELECT broken"):
+            tickets._db().close()
+        self.assertIn("idx_tickets_email", self.indexes(conn))
+
+    def test_open_uses_one_connection(self):
+        args = mock.Mock(client_name="Ana", client_email="ana@example.com", summary="Sem sinal",
+                         physical=True, logical=False, no_email=False, send_now=False)
+        with mock.patch.object(tickets, "_db", wraps=tickets._db) as db, \
+             mock.patch.dict(os.environ, {"SUPPORT_TEAM_EMAIL": "equipe@example.com"}):
+            self.assertEqual(tickets.cmd_ticket_open(args), 0)
+        self.assertEqual(db.call_count, 1)
+        conn = tickets._db()
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0], 1)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM mail_queue").fetchone()[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""MonitorMetrics enviando amostras a um StatsD de teste em loopback (IPv4 e IPv6)."""
+
+import socket
+import unittest
+
+from wifipro.monitor import MonitorMetrics
+
+
+class StatsdTest(unittest.TestCase):
+
+    def sink(self, family, host):
+        try:
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.bind((host, 0))
+        except OSError:
+            self.skipTest(f"{host} indisponível")
+        sock.settimeout(2.0)
+        self.addCleanup(sock.close)
+        return sock
+
+    def check(self, sock, address):
+        metrics = MonitorMetrics(["gw.local"], statsd=address)
+        self.addCleanup(metrics._statsd.close)
+        self.assertEqual(metrics._statsd.family, sock.family)
+        metrics.observe("gw.local", [(0, 1.5), (1, None)], jitter=0.25)
+        lines = sock.recv(4096).decode().splitlines()
+        self.assertEqual(lines, ["wifipro.gw_local.rtt:1.500|ms", "wifipro.gw_local.lost:1|c",
+                                 "wifipro.gw_local.jitter:0.250|g"])
+
+    def test_ipv4(self):
+        sock = self.sink(socket.AF_INET, "127.0.0.1")
+        self.check(sock, f"127.0.0.1:{sock.getsockname()[1]}")
+
+    def test_ipv6(self):
+        sock = self.sink(socket.AF_INET6, "::1")
+        self.check(sock, f"[::1]:{sock.getsockname()[1]}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""NativeProber (ICMP/UDP/TCP) contra servidores em loopback e parsing da saída do ping."""
+
+import socket
+import struct
+import unittest
+
+from wifipro.bench import PING_FIXTURES, _echo_responder
+from wifipro.probing import NativeProber, _parse_ping_output
+
+
+def _free_port(kind):
+    """Porta de loopback livre (fechada logo em seguida, então nada escuta nela)."""
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class NativeProberUdpTest(unittest.TestCase):
+
+    def test_echo(self):
+        sock, port = _echo_responder()
+        self.addCleanup(sock.close)
+        with NativeProber("127.0.0.1", method="udp", port=port, timeout=1.0) as prober:
+            samples = prober.probe(count=5, interval=0)
+        self.assertEqual(prober.method, "udp")
+        self.assertEqual(len(samples), 5)
+        for ts, rtt in samples:
+            self.assertIsInstance(ts, int)
+            self.assertIsNotNone(rtt)
+            self.assertGreaterEqual(rtt, 0.0)
+        self.assertEqual([ts for ts, _ in samples], sorted(ts for ts, _ in samples))
+
+    def test_port_unreachable_counts_as_reply(self):
+        with NativeProber("127.0.0.1", method="udp", port=_free_port(socket.SOCK_DGRAM), timeout=1.0) as prober:
+            samples = prober.probe(count=3, interval=0.05)
+        self.assertTrue(all(rtt is not None for _, rtt in samples), samples)
+
+    def test_silent_port_is_loss(self):
+        sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sink.bind(("127.0.0.1", 0))
+        self.addCleanup(sink.close)
+        with NativeProber("127.0.0.1", method="udp", port=sink.getsockname()[1], timeout=0.1) as prober:
+            samples = prober.probe(count=2, interval=0)
+        self.assertEqual([rtt for _, rtt in samples], [None, None])
+
+
+class NativeProberTcpTest(unittest.TestCase):
+
+    def test_listener(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(16)
+        self.addCleanup(server.close)
+        with NativeProber("127.0.0.1", method="tcp", port=server.getsockname()[1], timeout=1.0) as prober:
+            samples = prober.probe(count=4, interval=0)
+        self.assertEqual(prober.method, "tcp")
+        self.assertEqual(len(samples), 4)
+        self.assertTrue(all(rtt is not None and rtt >= 0.0 for _, rtt in samples), samples)
+
+    def test_refused_port_still_measures(self):
+        with NativeProber("127.0.0.1", method="tcp", port=_free_port(socket.SOCK_STREAM), timeout=1.0) as prober:
+            samples = prober.probe(count=2, interval=0)
+        self.assertTrue(all(rtt is not None for _, rtt in samples), samples)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            NativeProber("127.0.0.1", method="smoke-signal")
+
+
+class NativeProberIcmpTest(unittest.TestCase):
+
+    def test_checksum_rfc1071_vector(self):
+        # Exemplo numérico da RFC 1071 (seção 3): soma 0xddf2, complemento 0x220d
+        self.assertEqual(NativeProber._checksum(bytes.fromhex("0001f203f4f5f6f7")), 0x220D)
+
+    def test_checksum_odd_length_pads_with_zero(self):
+        self.assertEqual(NativeProber._checksum(b"\x01\x02\x03"), NativeProber._checksum(b"\x01\x02\x03\x00"))
+
+    def test_checksum_verifies_to_zero(self):
+        header = struct.pack("!BBHHH", 8, 0, 0, 0x1234, 7) + b"wifi-pro\x00\x07"
+        csum = NativeProber._checksum(header)
+        packet = header[:2] + csum.to_bytes(2, "big") + header[4:]
+        self.assertEqual(NativeProber._checksum(packet), 0)
+
+    def test_loopback_echo(self):
+        try:
+            prober = NativeProber("127.0.0.1", method="icmp", timeout=1.0)
+        except PermissionError:
+            self.skipTest("socket ICMP sem privilégio (net.ipv4.ping_group_range)")
+        with prober:
+            samples = prober.probe(count=3, interval=0)
+        self.assertEqual(prober.method, "icmp")
+        self.assertEqual(len(samples), 3)
+        self.assertTrue(all(rtt is not None and rtt >= 0.0 for _, rtt in samples), samples)
+
+
+class ParsePingOutputTest(unittest.TestCase):
+
+    def test_fixtures(self):
+        for name, (text, expected) in PING_FIXTURES.items():
+            with self.subTest(name):
+                self.assertEqual(_parse_ping_output(text), expected)
+
+    def test_empty_output(self):
+        rtts, loss = _parse_ping_output("")
+        self.assertEqual(rtts, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""Amostras gravadas pelo monitor --record e consultas do history."""
+
+import os
+import random
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from wifipro import storage
+from wifipro.storage import _aggregate_samples, _local_offset_us
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "requer time.tzset")
+class LocalBucketTest(unittest.TestCase):
+
+    def setUp(self):
+        patch = mock.patch.dict(os.environ, {"TZ": "America/Sao_Paulo"})
+        patch.start()
+        self.addCleanup(time.tzset)
+        self.addCleanup(patch.stop)
+        time.tzset()
+
+    def test_buckets_start_at_local_midnight_and_hour(self):
+        noon = datetime(2026, 10, 10, 12, 0)
+        offset = _local_offset_us(noon)
+        self.assertEqual(offset, -3 * 3600 * 10**6)
+        ts = int(noon.timestamp() * 1e6) + 7 * 60 * 10**6  # 12:07 local
+        for bucket, expected in ((86400, datetime(2026, 10, 10, 0, 0)), (3600, datetime(2026, 10, 10, 12, 0)),
+                                 (300, datetime(2026, 10, 10, 12, 5))):
+            with self.subTest(bucket=bucket):
+                (key,) = _aggregate_samples([(ts, 10.0)], bucket * 10**6, offset)
+                self.assertEqual(datetime.fromtimestamp(key / 1e6), expected)
+
+
+class RollupQueryTest(unittest.TestCase):
+    """_query_samples (resumos .sum + bordas brutas) deve bater com a agregação do .bin inteiro."""
+
+    HOUR = 3600 * 10**6
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patch = mock.patch.object(storage, "SAMPLES", Path(tmp.name))
+        patch.start()
+        self.addCleanup(patch.stop)
+        # Dois dias e pouco a cada 20 s, começando no meio de um dia: força a virada e a compactação
+        rng = random.Random(11)
+        self.start = int(datetime(2026, 10, 10, 15, 17, 23).timestamp() * 1e6)
+        self.end = self.start + 50 * self.HOUR
+        log = storage.SampleLog(batch=32)
+        for ts in range(self.start, self.end, 20 * 10**6):
+            log.append("gw", [(ts, None if rng.random() < 0.02 else rng.lognormvariate(2.5, 0.5))])
+        log.close()
+        self.days = sorted(storage.SAMPLES.glob("gw/*.bin"))
+
+    def assertSameAsRaw(self, start, end, bucket=None, offset=0):
+        got = storage._query_samples("gw", start, end, bucket, offset)
+        expected = _aggregate_samples(storage._read_samples("gw", start, end), bucket, offset)
+        self.assertEqual(list(got), list(expected))
+        for key, row in expected.items():
+            for field, value in row.items():
+                if value is None:
+                    self.assertIsNone(got[key][field])
+                else:
+                    self.assertAlmostEqual(got[key][field], value, places=6, msg=(key, field))
+
+    def check_ranges(self):
+        rng = random.Random(5)
+        ranges = [(self.start, self.end), (self.start + 7 * 10**6, self.end - 90 * 10**6)]
+        ranges += [(a, a + rng.randrange(10**6, 30 * self.HOUR)) for a in
+                   (rng.randrange(self.start - self.HOUR, self.end) for _ in range(6))]
+        for start, end in ranges:
+            for bucket in (None, 60 * 10**6, 300 * 10**6, self.HOUR, 24 * self.HOUR, 45 * 10**6):
+                for offset in (0, -3 * self.HOUR, 19800 * 10**6):
+                    with self.subTest(start=start, end=end, bucket=bucket, offset=offset):
+                        self.assertSameAsRaw(start, end, bucket, offset)
+
+    def test_sidecars_written(self):
+        self.assertEqual(len(self.days), 3)
+        for path in self.days:
+            widths = {chunk[2] for chunk in storage._read_rollups(path.with_suffix(".sum"))}
+            self.assertEqual(widths, {storage.ROLLUP_MINUTE_US, storage.ROLLUP_HOUR_US})
+
+    def test_compacted(self):
+        self.check_ranges()
+
+    def test_batches_without_compaction(self):
+        # Blocos por lote, como o monitor deixa enquanto ainda grava o dia
+        for path in self.days:
+            data, out = path.read_bytes(), b""
+            step = 32 * storage.SAMPLE_RECORD.size
+            for i in range(0, len(data), step):
+                acc = {}
+                part = data[i:i + step]
+                storage._fold_samples(acc, storage._iter_records(part, 0, len(part) // storage.SAMPLE_RECORD.size),
+                                      storage.ROLLUP_MINUTE_US)
+                out += storage._pack_rollups(i, i + len(part), storage.ROLLUP_MINUTE_US, acc)
+            path.with_suffix(".sum").write_bytes(out)
+        self.check_ranges()
+
+    def test_missing_truncated_and_overlapping_sidecars(self):
+        self.days[0].with_suffix(".sum").unlink()
+        truncated = self.days[1].with_suffix(".sum")
+        truncated.write_bytes(truncated.read_bytes()[:-100])
+        # Bloco anexado sobre um trecho já compactado (outro processo gravando ao mesmo tempo)
+        size = storage.SAMPLE_RECORD.size
+        part = self.days[2].read_bytes()[10 * size:50 * size]
+        acc = {}
+        storage._fold_samples(acc, storage._iter_records(part, 0, 40), storage.ROLLUP_MINUTE_US)
+        with open(self.days[2].with_suffix(".sum"), "ab") as f:
+            f.write(storage._pack_rollups(10 * size, 50 * size, storage.ROLLUP_MINUTE_US, acc))
+        self.check_ranges()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+"""Resumo do --trace com spans sobrepostos."""
+
+import unittest
+
+from wifipro.trace import Tracer, _wall_ms
+
+
+class TraceSummaryTest(unittest.TestCase):
+
+    def test_wall_is_the_command_span_even_with_overlapping_runs(self):
+        tracer = Tracer()
+        tracer.add("command", 0, 1000 * 10**6, {})
+        for i in range(5):
+            tracer.add("run", i, 900 * 10**6, {})  # 5 runs em paralelo: 4500ms somados
+        rows = tracer.summary()
+        self.assertEqual(rows[0][0], "run")
+        self.assertAlmostEqual(_wall_ms(rows), 1000.0)
+
+    def test_wall_falls_back_to_sum_without_command(self):
+        tracer = Tracer()
+        tracer.add("db.open", 0, 2 * 10**6, {})
+        tracer.add("template.render", 0, 3 * 10**6, {})
+        self.assertAlmostEqual(_wall_ms(tracer.summary()), 5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
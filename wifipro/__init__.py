@@ -0,0 +1 @@
+"""Reparador de Wi‑Fi — utilitários de rede, monitoramento e tickets."""
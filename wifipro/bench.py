@@ -0,0 +1,322 @@
+"""Benchmarks dos caminhos quentes e comparação com a baseline salva (comando bench)."""
+
+import platform
+import time
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+
+from .common import console, ROOT
+from .monitor import _run_fixed_rate
+from .probing import NativeProber, _parse_ping_output
+from .stats import StreamStats
+from .storage import _aggregate_samples
+from . import storage, tickets
+
+BENCH_BASELINE = ROOT / "bench_baseline.json"
+
+# Saídas reais de `ping` e o que _parse_ping_output deve extrair delas
+PING_FIXTURES = {
+    "linux": ("""PING 1.1.1.1 (1.1.1.1) 56(84) bytes of data.
+64 bytes from 1.1.1.1: icmp_seq=1 ttl=57 time=12.3 ms
+64 bytes from 1.1.1.1: icmp_seq=2 ttl=57 time=11.8 ms
+64 bytes from 1.1.1.1: icmp_seq=4 ttl=57 time=13.1 ms
+
+--- 1.1.1.1 ping statistics ---
+4 packets transmitted, 3 received, 25% packet loss, time 3004ms
+rtt min/avg/max/mdev = 11.800/12.400/13.100/0.535 ms
+""", ([12.3, 11.8, 13.1], 25.0)),
+    "windows-pt": ("""
+Disparando 1.1.1.1 com 32 bytes de dados:
+Resposta de 1.1.1.1: bytes=32 tempo=14ms TTL=57
+Resposta de 1.1.1.1: bytes=32 tempo=15ms TTL=57
+Esgotado o tempo limite do pedido.
+Resposta de 1.1.1.1: bytes=32 tempo<1ms TTL=57
+
+Estatísticas do Ping para 1.1.1.1:
+    Pacotes: Enviados = 4, Recebidos = 3, Perdidos = 1 (25% de perda),
+Aproximar um número redondo de vezes em milissegundos:
+    Mínimo = 1ms, Máximo = 15ms, Média = 10ms
+""", ([14.0, 15.0, 1.0], 25.0)),
+    "windows-en": ("""
+Pinging 1.1.1.1 with 32 bytes of data:
+Reply from 1.1.1.1: bytes=32 time=9ms TTL=57
+Reply from 1.1.1.1: bytes=32 time<1ms TTL=57
+Reply from 1.1.1.1: bytes=32 time=10ms TTL=57
+Reply from 1.1.1.1: bytes=32 time=11ms TTL=57
+
+Ping statistics for 1.1.1.1:
+    Packets: Sent = 4, Received = 4, Lost = 0 (0% loss),
+Approximate round trip times in milli-seconds:
+    Minimum = 1ms, Maximum = 11ms, Average = 7ms
+""", ([9.0, 1.0, 10.0, 11.0], 0.0)),
+}
+
+def _bench_time(fn, repeat):
+    """Executa `fn` `repeat` vezes e retorna as durações em ms."""
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def _bench_median(fn, runs=3):
+    """Roda um benchmark ruidoso `runs` vezes e fica com a mediana de cada métrica."""
+    outs = [fn() for _ in range(runs)]
+    return {k: _pct([o[k] for o in outs], 0.5) for k in outs[0]}
+
+def _bench_parse(n=20000):
+    results, failures = {}, []
+    for name, (text, expected) in PING_FIXTURES.items():
+        got = _parse_ping_output(text)
+        if got != expected:
+            failures.append(f"parse {name}: esperado {expected}, obtido {got}")
+        t0 = time.perf_counter()
+        for _ in range(n):
+            _parse_ping_output(text)
+        results[f"parse.{name} (ops/s)"] = n / (time.perf_counter() - t0)
+    return results, failures
+
+def _bench_stats(n=200000):
+    import random
+    rng = random.Random(42)
+    rtts = [None if rng.random() < 0.01 else rng.lognormvariate(3, 0.4) for _ in range(n)]
+    st = StreamStats()
+    now = time.time()
+    t0 = time.perf_counter()
+    for i, rtt in enumerate(rtts):
+        st.add(rtt, now + i * 0.01)
+    results = {"stats.add (amostras/s)": n / (time.perf_counter() - t0)}
+    results["stats.snapshot 1h (ms)"] = _pct(_bench_time(lambda: st.snapshot("1h", now + n * 0.01), 20), 0.5)
+    base_us = int(now * 1e6)
+    samples = [(base_us + i * 10_000, rtt) for i, rtt in enumerate(rtts)]
+    results["history.aggregate 1min (ms)"] = _pct(_bench_time(lambda: _aggregate_samples(samples, 60_000_000), 5), 0.5)
+    return results
+
+def _bench_history(workdir, days=2):
+    """Grava `days` dias de amostras a 1 Hz com SampleLog e mede o history sobre os resumos (.sum)."""
+    import random
+    rng = random.Random(7)
+    saved = storage.SAMPLES
+    storage.SAMPLES = Path(workdir) / "samples"
+    try:
+        n = days * 86400
+        end_us = int(time.time() * 1e6)
+        start_us = end_us - n * 1_000_000
+        log = storage.SampleLog()
+        t0 = time.perf_counter()
+        for i in range(n):
+            log.append("gw", [(start_us + i * 1_000_000, None if rng.random() < 0.01 else rng.lognormvariate(2.5, 0.4))])
+        log.close()
+        results = {"history.record (amostras/s)": n / (time.perf_counter() - t0)}
+        offset = storage._local_offset_us(datetime.now())
+        for label, bucket in ((f"{days}d", None), (f"{days}d por 1h", 3_600_000_000)):
+            results[f"history.query {label} (ms)"] = _pct(_bench_time(
+                lambda: storage._query_samples("gw", start_us, end_us, bucket, offset), 5), 0.5)
+        return results
+    finally:
+        storage.SAMPLES = saved
+
+def _bench_tickets(size, workdir):
+    """Base sintética com `size` tickets; mede open/list/view pelos próprios comandos."""
+    import contextlib
+    import io
+    import random
+    from main import build_parser
+    saved = tickets.TICKETS_SQLITE, tickets.TICKETS_DB
+    tickets.TICKETS_SQLITE = Path(workdir) / f"tickets-{size}.db"
+    tickets.TICKETS_DB = Path(workdir) / "sem-json-legado.json"
+    try:
+        conn = tickets._db()
+        rng = random.Random(size)
+        start = datetime(2025, 1, 1).timestamp()
+        with conn:
+            conn.executemany(
+                f"INSERT INTO tickets ({', '.join(tickets.TICKET_FIELDS)}) VALUES ({', '.join('?' * len(tickets.TICKET_FIELDS))})",
+                ((f"BEN-{i:08d}", f"Cliente {i % 5000}", f"cliente{i % 5000}@exemplo.com", "Wi-Fi lento",
+                  rng.choice(("Físico", "Lógico")),
+                  datetime.fromtimestamp(start + i * 30).strftime("%Y-%m-%d %H:%M:%S"),
+                  rng.choice(("Recebido", "Em andamento", "Fechado"))) for i in range(size)))
+        conn.close()
+
+        parser = build_parser()
+        def cli(*argv):
+            args = parser.parse_args(list(argv))
+            with contextlib.redirect_stdout(io.StringIO()):
+                args.func(args)
+
+        ids = [f"BEN-{rng.randrange(size):08d}" for _ in range(50)]
+        middle = f"BEN-{size // 2:08d}"
+        p = f"tickets.{size // 1000}k"
+        return {
+            f"{p}.open (ms)": _pct(_bench_time(lambda: cli("ticket", "open", "--client-name", "Bench", "--client-email",
+                                                           "bench@exemplo.com", "--summary", "Teste", "--logical"), 20), 0.5),
+            f"{p}.view (ms)": _pct(_bench_time(lambda: cli("ticket", "view", "--id", ids.pop()), 40), 0.5),
+            f"{p}.list (ms)": _pct(_bench_time(lambda: cli("ticket", "list", "--format", "jsonl", "--limit", "50"), 20), 0.5),
+            f"{p}.list cursor (ms)": _pct(_bench_time(lambda: cli("ticket", "list", "--format", "jsonl", "--limit", "50",
+                                                                  "--cursor", middle), 20), 0.5),
+            f"{p}.list cliente (ms)": _pct(_bench_time(lambda: cli("ticket", "list", "--format", "jsonl",
+                                                                   "--client", "cliente42@exemplo.com"), 20), 0.5),
+        }
+    finally:
+        tickets.TICKETS_SQLITE, tickets.TICKETS_DB = saved
+
+def _bench_cold_start(db_path, runs=15):
+    """
+    Latência de um processo novo (`python main.py ...`), como quando um script chama o CLI.
+    Inclui interpretador, compilação/carga de bytecode e imports; a base é a sintética `db_path`.
+    """
+    import os
+    import subprocess
+    import sys
+    env = dict(os.environ, TICKETS_SQLITE=str(db_path))
+    results = {}
+    for label, argv in (("ticket view", ["ticket", "view", "--id", "BEN-00000001"]),
+                        ("ticket list", ["ticket", "list", "--format", "jsonl", "--limit", "1"]),
+                        ("help", ["--help"])):
+        cmd = [sys.executable, str(ROOT / "main.py"), *argv]
+        subprocess.run(cmd, env=env, capture_output=True)  # aquece o cache de bytecode e do SO
+        results[f"startup.{label} (ms)"] = _pct(_bench_time(lambda: subprocess.run(cmd, env=env, capture_output=True), runs), 0.5)
+    return results
+
+def _echo_responder():
+    """Servidor de eco UDP em loopback (thread daemon). Retorna (socket, porta)."""
+    import socket
+    import threading
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+
+    def loop():
+        while True:
+            try:
+                data, addr = sock.recvfrom(2048)
+                sock.sendto(data, addr)
+            except OSError:
+                return
+
+    threading.Thread(target=loop, daemon=True).start()
+    return sock, sock.getsockname()[1]
+
+def _bench_probe(count=500):
+    sock, port = _echo_responder()
+    try:
+        with NativeProber("127.0.0.1", method="udp", port=port) as prober:
+            t0 = time.perf_counter()
+            rtts = [rtt for _, rtt in prober.probe(count, interval=0)]
+            rate = count / (time.perf_counter() - t0)
+    finally:
+        sock.close()
+    got = [r for r in rtts if r is not None]
+    return {
+        "probe.echo p50 (ms)": _pct(got, 0.5) if got else math.inf,
+        "probe.echo perda (%)": 100.0 * (count - len(got)) / count,
+        "probe.echo (sondas/s)": rate,
+    }
+
+def _bench_schedule(targets=16, interval=0.05, duration=1.5):
+    """Atraso de disparo do agendador em relação à grade ideal, com `targets` alvos."""
+    fired = {f"alvo{i}": [] for i in range(targets)}
+    sock, port = _echo_responder()
+    probers = {t: NativeProber("127.0.0.1", method="udp", port=port) for t in fired}
+
+    def probe(t):
+        fired[t].append(time.monotonic())
+        return probers[t].probe(1)
+
+    try:
+        stats = _run_fixed_rate(list(fired), interval, duration, probe, lambda *a: None, max_workers=targets)
+    finally:
+        for p in probers.values():
+            p.close()
+        sock.close()
+    # A grade começa no primeiro disparo; cada sonda é medida contra o slot em que caiu
+    start = min(times[0] for times in fired.values() if times)
+    late = [((ts - start) % interval) * 1000 for times in fired.values() for ts in times]
+    return {
+        "sched.atraso p50 (ms)": _pct(late, 0.5),
+        "sched.atraso p99 (ms)": _pct(late, 0.99),
+        "sched.ticks perdidos": float(sum(s["missed"] for s in stats.values())),
+    }
+
+# Métricas em que maior é melhor; nas demais, menor é melhor
+_BENCH_HIGHER = ("ops/s", "amostras/s", "sondas/s")
+# Folga absoluta abaixo da qual uma diferença é ruído (por unidade)
+_BENCH_SLACK = {"ms": 0.5, "%": 1.0, "perdidos": 1.0}
+
+def _bench_regressed(name, value, base, tolerance):
+    if any(unit in name for unit in _BENCH_HIGHER):
+        return value < base * (1 - tolerance)
+    slack = next((s for unit, s in _BENCH_SLACK.items() if unit in name), 0)
+    return value > base * (1 + tolerance) and value - base > slack
+
+def cmd_bench(args):
+    import tempfile
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results, failures = {}, []
+
+    console.print("[bold blue]Benchmark:[/bold blue] parsing, estatísticas, sondas e agendador...")
+    parsed, failures = _bench_parse()
+    results.update(parsed)
+    results.update(_bench_stats())
+    results.update(_bench_median(_bench_probe))
+    results.update(_bench_median(_bench_schedule))
+    with tempfile.TemporaryDirectory() as workdir:
+        console.print("[bold blue]Benchmark:[/bold blue] histórico gravado (2 dias a 1 Hz)...")
+        results.update(_bench_history(workdir))
+        for size in sizes:
+            console.print(f"[bold blue]Benchmark:[/bold blue] base de tickets com {size} registros...")
+            results.update(_bench_tickets(size, workdir))
+        if sizes:
+            console.print("[bold blue]Benchmark:[/bold blue] partida a frio do CLI (subprocessos)...")
+            results.update(_bench_cold_start(Path(workdir) / f"tickets-{sizes[-1]}.db"))
+
+    baseline_path = Path(args.baseline) if args.baseline else BENCH_BASELINE
+    baseline = {}
+    if baseline_path.exists() and not args.save:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8")).get("results", {})
+
+    regressions = []
+    rows = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        status = "-"
+        if base is not None:
+            delta = (value - base) / base * 100 if base else 0.0
+            status = f"{delta:+.0f}%"
+            if _bench_regressed(name, value, base, args.tolerance):
+                regressions.append(name)
+                status += " REGRESSÃO"
+        rows.append((name, f"{value:,.2f}", "-" if base is None else f"{base:,.2f}", status))
+
+    try:
+        from rich.table import Table
+        table = Table(title=f"Benchmark (tolerância {args.tolerance:.0%})")
+        for col in ("Métrica", "Valor", "Baseline", "Δ"):
+            table.add_column(col, no_wrap=True)
+        for row in rows:
+            table.add_row(*row, style="red" if row[3].endswith("REGRESSÃO") else None)
+        console.print(table)
+    except ImportError:
+        for row in rows:
+            console.print(" | ".join(row))
+
+    for failure in failures:
+        console.print(f"[red]FALHA:[/red] {failure}")
+
+    if args.save:
+        baseline_path.write_text(json.dumps({"saved_at": datetime.now().isoformat(timespec="seconds"),
+                                             "host": platform.node(), "results": results},
+                                            ensure_ascii=False, indent=2), encoding="utf-8")
+        console.print(f"[green]Baseline salva em[/green] {baseline_path}")
+    elif not baseline:
+        console.print(f"[yellow]Sem baseline em {baseline_path}; grave uma com --save.[/yellow]")
+
+    if regressions:
+        console.print(f"[bold red]{len(regressions)} regressão(ões) acima da tolerância.[/bold red]")
+    return 1 if regressions or failures else 0
@@ -0,0 +1,141 @@
+"""Console, caminhos, execução de comandos e o motor de sondagem paralela (base de todos os módulos)."""
+
+import time
+import re
+from datetime import datetime
+from pathlib import Path
+
+from .trace import span
+
+# Módulos pesados (rich, smtplib, email, dotenv, sqlite3, socket...) são importados
+# sob demanda dentro de cada comando: o CLI é chamado por scripts milhares de vezes.
+
+class SimpleConsole:
+    # Fallback if rich isn't installed
+    def print(self, *a, **k):
+        print(*a)
+
+class _LazyConsole:
+    """Console da rich criado só no primeiro print (importar a rich custa dezenas de ms)."""
+
+    _impl = None
+
+    def print(self, *a, **k):
+        if _LazyConsole._impl is None:
+            try:
+                from rich.console import Console
+                _LazyConsole._impl = Console()
+            except Exception:
+                _LazyConsole._impl = SimpleConsole()
+        _LazyConsole._impl.print(*a, **k)
+
+console = _LazyConsole()
+
+_ENV_LOADED = False
+
+def _load_env():
+    """Carrega o .env (necessário para SMTP/empresa) uma única vez, só quando um comando precisa."""
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    _ENV_LOADED = True
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+ROOT = Path(__file__).resolve().parent.parent
+REPORTS = ROOT / "reports"
+TEMPLATES = ROOT / "templates"
+
+def run(cmd, shell=True, timeout=None):
+    """Executa um comando de sistema e retorna o código, stdout e stderr."""
+    import subprocess
+    with span("run", cmd=cmd if isinstance(cmd, str) else " ".join(cmd)) as sp:
+        try:
+            # Usa shell=False para maior segurança, a menos que o comando exija shell (como `ifconfig || ip a`)
+            res = subprocess.run(cmd, shell=shell, capture_output=True, text=True, check=False, encoding='utf-8', timeout=timeout)
+            sp.set(code=res.returncode)
+            return res.returncode, res.stdout.strip(), res.stderr.strip()
+        except subprocess.TimeoutExpired:
+            sp.set(code=124)
+            return 124, "", f"Tempo esgotado após {timeout}s"
+        except Exception as e:
+            sp.set(code=1)
+            return 1, "", str(e)
+
+# Limites padrão do motor de sondagem paralela
+PROBE_TIMEOUT = 15   # segundos por sonda
+PROBE_WORKERS = 8    # sondas simultâneas
+DEFAULT_TARGETS = ["1.1.1.1", "8.8.8.8", "google.com"]
+
+def _ping_cmd(target, count=4):
+    """Monta o comando de ping adequado ao sistema operacional."""
+    import platform
+    count_flag = "-n" if platform.system() == "Windows" else "-c"
+    return ["ping", count_flag, str(count), target]
+
+def _iter_probes(jobs, max_workers=PROBE_WORKERS, timeout=PROBE_TIMEOUT):
+    """
+    Executa vários comandos ao mesmo tempo em um pool limitado de threads e
+    entrega (chave, (code, out, err, elapsed)) à medida que cada um termina.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def _probe(cmd):
+        t0 = time.monotonic()
+        code, out, err = run(cmd, shell=isinstance(cmd, str), timeout=timeout)
+        return code, out, err, time.monotonic() - t0
+
+    workers = max(1, min(max_workers, len(jobs) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_probe, cmd): key for key, cmd in jobs}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+def _run_probes(jobs, max_workers=PROBE_WORKERS, timeout=PROBE_TIMEOUT):
+    """
+    Como `_iter_probes`, mas retorna um dict chave -> (code, out, err, elapsed)
+    na mesma ordem de `jobs`; o tempo total fica próximo ao da sonda mais lenta.
+    """
+    results = dict(_iter_probes(jobs, max_workers, timeout))
+    return {key: results[key] for key, _ in jobs}
+
+# Padrões que também aparecem na ajuda do CLI (main.py os lê sem importar os comandos)
+DNS_NAMES = ["google.com", "youtube.com", "whatsapp.net", "microsoft.com", "netflix.com", "gov.br"]
+DNS_QTYPES = {"A": 1, "AAAA": 28}
+SPEED_PORT = 5201
+FLEET_PORT = 8765
+
+def _split_hostport(value, default_port):
+    """
+    Separa "host:porta" em (host, porta). IPv6 com porta vai entre colchetes ("[::1]:5353");
+    "[::1]" ou "::1" sem colchetes usam `default_port`.
+    """
+    value = value.strip()
+    if value.startswith("["):
+        host, _, rest = value[1:].partition("]")
+        if rest[:1] == ":" and rest[1:]:
+            return host, int(rest[1:])
+        return host, default_port
+    host, sep, port = value.rpartition(":")
+    if sep and host and ":" not in host:
+        return host, int(port)
+    return value, default_port
+
+def _parse_span(value):
+    """Converte 30s/5m/1h/1d em segundos."""
+    m = re.fullmatch(r"(\d+)([smhd])", value.strip())
+    if not m:
+        raise ValueError(f"Intervalo inválido: {value}")
+    return int(m.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+
+
+def _parse_when(value, default):
+    """Aceita AAAA-MM-DD[ HH:MM[:SS]] ou um deslocamento relativo a agora (30m, 12h, 7d)."""
+    if not value:
+        return default
+    if re.fullmatch(r"\d+[smhd]", value.strip()):
+        return datetime.fromtimestamp(time.time() - _parse_span(value))
+    return datetime.fromisoformat(value)
@@ -0,0 +1,130 @@
+"""Benchmark de DNS com resolvedor stub assíncrono embutido (comando dns)."""
+
+import time
+import struct
+
+from .common import console, DNS_NAMES, DNS_QTYPES, _split_hostport
+from .stats import _aggregate
+
+# --- Benchmark de DNS (resolvedor stub assíncrono embutido) ---
+
+DNS_RESOLVERS = ["1.1.1.1", "8.8.8.8", "9.9.9.9"]
+
+def _system_resolvers():
+    """Servidores DNS do sistema (resolv.conf); vazio onde não existe (Windows)."""
+    try:
+        with open("/etc/resolv.conf") as f:
+            return [line.split()[1] for line in f if line.startswith("nameserver") and len(line.split()) > 1]
+    except OSError:
+        return []
+
+def _dns_query_packet(qid, name, qtype=1):
+    """Monta uma consulta DNS (RD=1, uma pergunta, classe IN)."""
+    qname = b"".join(bytes([len(label)]) + label.encode("idna") for label in name.rstrip(".").split(".")) + b"\0"
+    return struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", qtype, 1)
+
+def _dns_parse_header(data):
+    """Retorna (id, rcode, número de respostas) do cabeçalho de uma resposta DNS."""
+    qid, flags, _, ancount, _, _ = struct.unpack("!HHHHHH", data[:12])
+    return qid, flags & 0x0F, ancount
+
+async def _dns_bench(resolvers, names, rounds=3, timeout=2.0, qtype=1):
+    """
+    Consulta todos os nomes em todos os resolvedores ao mesmo tempo: uma rodada "fria"
+    e `rounds` rodadas "quentes" (respostas já no cache do resolvedor).
+    Retorna {resolvedor: {"cold": [ms], "warm": [ms], "queries", "timeouts", "nxdomain", "errors"}}.
+    """
+    import asyncio
+    import random
+    loop = asyncio.get_running_loop()
+
+    class Client(asyncio.DatagramProtocol):
+        def __init__(self):
+            self.pending = {}
+
+        def datagram_received(self, data, addr):
+            if len(data) < 12:
+                return
+            qid, rcode, ancount = _dns_parse_header(data)
+            fut = self.pending.pop(qid, None)
+            if fut is not None and not fut.done():
+                fut.set_result((time.perf_counter(), rcode, ancount))
+
+        def error_received(self, exc):
+            for fut in self.pending.values():
+                if not fut.done():
+                    fut.set_exception(exc)
+            self.pending.clear()
+
+    results, endpoints = {}, {}
+    for r in resolvers:
+        results[r] = {"cold": [], "warm": [], "queries": 0, "timeouts": 0, "nxdomain": 0, "errors": 0}
+        endpoints[r] = await loop.create_datagram_endpoint(Client, remote_addr=_split_hostport(r, 53))
+
+    async def query(resolver, name, kind):
+        transport, client = endpoints[resolver]
+        res = results[resolver]
+        qid = random.randrange(65536)
+        while qid in client.pending:
+            qid = random.randrange(65536)
+        fut = loop.create_future()
+        client.pending[qid] = fut
+        res["queries"] += 1
+        t0 = time.perf_counter()
+        transport.sendto(_dns_query_packet(qid, name, qtype))
+        try:
+            t1, rcode, _ = await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            client.pending.pop(qid, None)
+            res["timeouts"] += 1
+            return
+        except OSError:
+            res["errors"] += 1
+            return
+        if rcode == 3:
+            res["nxdomain"] += 1
+        elif rcode != 0:
+            res["errors"] += 1
+        res[kind].append((t1 - t0) * 1000)
+
+    try:
+        await asyncio.gather(*(query(r, n, "cold") for r in resolvers for n in names))
+        for _ in range(rounds):
+            await asyncio.gather(*(query(r, n, "warm") for r in resolvers for n in names))
+    finally:
+        for transport, _ in endpoints.values():
+            transport.close()
+    return results
+
+def cmd_dns(args):
+    import asyncio
+    resolvers = args.resolvers or (_system_resolvers() + [r for r in DNS_RESOLVERS if r not in _system_resolvers()])
+    names = args.names or DNS_NAMES
+    console.print(f"[bold blue]DNS:[/bold blue] {len(names)} nome(s) × {len(resolvers)} resolvedor(es), {args.rounds} rodada(s) quente(s)")
+
+    t0 = time.perf_counter()
+    results = asyncio.run(_dns_bench(resolvers, names, args.rounds, args.timeout, DNS_QTYPES[args.type]))
+    elapsed = time.perf_counter() - t0
+
+    fmt = lambda v: "-" if v is None else f"{v:.1f}"
+    header = ["Resolvedor", "Qtd", "Timeout%", "NXDOMAIN%", "Fria p50", "Fria p95", "Quente p50", "Quente p95", "Ganho"]
+    lines = []
+    for r, res in results.items():
+        q = res["queries"] or 1
+        cold50, warm50 = _aggregate(res["cold"], "median"), _aggregate(res["warm"], "median")
+        gain = cold50 - warm50 if cold50 is not None and warm50 is not None else None
+        lines.append([r, str(res["queries"]), f"{100 * res['timeouts'] / q:.1f}", f"{100 * res['nxdomain'] / q:.1f}",
+                      fmt(cold50), fmt(_aggregate(res["cold"], "p95")), fmt(warm50), fmt(_aggregate(res["warm"], "p95")), fmt(gain)])
+    try:
+        from rich.table import Table
+        table = Table(title=f"Benchmark de DNS ({elapsed:.1f}s, tempos em ms)")
+        for col in header:
+            table.add_column(col, no_wrap=col == "Resolvedor")
+        for line in lines:
+            table.add_row(*line)
+        console.print(table)
+    except ImportError:
+        console.print(" | ".join(header))
+        for line in lines:
+            console.print(" | ".join(line))
+    return 0
@@ -0,0 +1,136 @@
+"""Modo frota: diagnóstico de vários hosts (fleet diagnose) e agente HTTP (fleet agent)."""
+
+import platform
+import time
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+
+from .common import console, REPORTS
+from .network import _diagnose_blocks
+from .probing import _latency_stats, NativeProber
+
+def _read_inventory(path):
+    """
+    Lê o inventário da frota: uma entrada por linha, `nome alvo` ou apenas `alvo`.
+    Alvos http(s):// são agentes (`fleet agent`); os demais são sondados a partir daqui.
+    """
+    hosts = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        hosts.append((parts[0], parts[1] if len(parts) > 1 else parts[0]))
+    return hosts
+
+def _fleet_probe(target, timeout, token=None):
+    """Diagnostica um host do inventário e retorna os blocos de texto do relatório."""
+    if target.startswith(("http://", "https://")):
+        import urllib.request
+        req = urllib.request.Request(target.rstrip("/") + "/diagnose", headers={"X-Fleet-Token": token} if token else {})
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))["blocks"]
+
+    import socket
+    t0 = time.perf_counter()
+    addr = socket.getaddrinfo(target, None)[0][4][0]
+    blocks = [f"Resolução: {target} → {addr} ({(time.perf_counter() - t0) * 1000:.1f}ms)"]
+    with NativeProber(addr, timeout=min(timeout, 1.0)) as p:
+        samples = p.probe(4)
+    latencies = [rtt for _, rtt in samples if rtt is not None]
+    min_lat, avg_lat, max_lat, loss_rate, jitter, code = _latency_stats(latencies, 100.0 * (len(samples) - len(latencies)) / len(samples))
+    if code != 0:
+        blocks.append(f"Latência ({p.method}): sem resposta | Perda: {loss_rate:.0f}%")
+    else:
+        blocks.append(f"Latência ({p.method}): mín {min_lat:.1f}ms | média {avg_lat:.1f}ms | máx {max_lat:.1f}ms | jitter {jitter:.1f}ms | perda {loss_rate:.0f}%")
+    return blocks
+
+def cmd_fleet_diagnose(args):
+    from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+    hosts = _read_inventory(args.inventory)
+    if not hosts:
+        console.print("[yellow]Inventário vazio.[/yellow]")
+        return 1
+
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    REPORTS.mkdir(exist_ok=True)
+    report = REPORTS / f"frota-{ts}.txt"
+    workers = max(1, min(args.workers, len(hosts)))
+    # Cada operação tem timeout próprio; o prazo global só protege contra hosts travados
+    deadline = args.timeout * math.ceil(len(hosts) / workers) + 5
+
+    def timed(target):
+        t0 = time.monotonic()
+        try:
+            return _fleet_probe(target, args.timeout, args.token), None, time.monotonic() - t0
+        except Exception as e:
+            return None, e, time.monotonic() - t0
+
+    console.print(f"[bold blue]Frota:[/bold blue] {len(hosts)} host(s), {workers} em paralelo")
+    t0 = time.monotonic()
+    ok = 0
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = {pool.submit(timed, target): (name, target) for name, target in hosts}
+    with open(report, "w", encoding="utf-8") as f:
+        f.write(f"Relatório de frota — {ts} — {len(hosts)} host(s)\n")
+        try:
+            # Os resultados entram no relatório na ordem em que terminam
+            for n, fut in enumerate(as_completed(futures, timeout=deadline), 1):
+                name, target = futures[fut]
+                blocks, err, elapsed = fut.result()
+                status = "OK" if err is None else f"FALHA: {err}"
+                ok += err is None
+                f.write(f"\n\n##### {name} ({target}) — {status} — {elapsed:.1f}s #####\n")
+                if blocks:
+                    f.write("\n\n".join(blocks))
+                f.flush()
+                color = "green" if err is None else "red"
+                console.print(f"[{n}/{len(hosts)}] [{color}]{name}[/{color}] {status} ({elapsed:.1f}s)")
+        except FuturesTimeout:
+            for fut, (name, target) in futures.items():
+                if not fut.done():
+                    f.write(f"\n\n##### {name} ({target}) — FALHA: sem resposta em {deadline:.0f}s #####\n")
+                    console.print(f"[red]{name}[/red] sem resposta em {deadline:.0f}s")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    console.print(f"[green]Relatório de frota salvo em:[/green] {report} ({ok}/{len(hosts)} OK, {time.monotonic() - t0:.1f}s)")
+    return 0 if ok == len(hosts) else 1
+
+def _fleet_server(args):
+    """Servidor HTTP do agente (GET /diagnose → blocos do diagnóstico local), ainda sem servir."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/diagnose":
+                self.send_error(404)
+                return
+            if args.token and self.headers.get("X-Fleet-Token") != args.token:
+                self.send_error(403)
+                return
+            body = json.dumps({"host": platform.node(), "blocks": _diagnose_blocks(args.workers, args.timeout)}, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *a):
+            console.print(f"[{datetime.now():%H:%M:%S}] {self.address_string()} {fmt % a}")
+
+    return ThreadingHTTPServer((args.bind, args.port), Handler)
+
+def cmd_fleet_agent(args):
+    server = _fleet_server(args)
+    console.print(f"[bold blue]Agente da frota[/bold blue] em http://{args.bind}:{server.server_port}/diagnose")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Agente encerrado pelo usuário.[/bold yellow]")
+    finally:
+        server.server_close()
+    return 0
@@ -0,0 +1,183 @@
+"""Fila de e-mails dos tickets e sessão SMTP reaproveitada (ticket mail-worker)."""
+
+import os
+import time
+
+from .common import console, _load_env
+from .trace import span
+
+# --- Fila de e-mails (enviada pelo `ticket mail-worker`) ---
+
+MAIL_MAX_ATTEMPTS = 6
+MAIL_BACKOFF = 30        # segundos; dobra a cada tentativa
+MAIL_BACKOFF_MAX = 3600
+MAIL_CLAIM_TIMEOUT = 600  # mensagens "sending" mais velhas que isso voltam para a fila
+
+def _smtp_config():
+    """
+    Lê a configuração SMTP do ambiente (.env); None sem SMTP_HOST.
+    SMTP_USER/SMTP_PASS são opcionais: sem eles não há login (relay local).
+    """
+    _load_env()
+    host = os.getenv("SMTP_HOST")
+    port = int(os.getenv("SMTP_PORT", "587"))
+    user = os.getenv("SMTP_USER")
+    pwd  = os.getenv("SMTP_PASS")
+    if not (host and port):
+        return None
+    return {
+        "host": host, "port": port, "user": user, "pwd": pwd,
+        "starttls": os.getenv("SMTP_STARTTLS", "1") != "0",
+        "from_addr": os.getenv("SUPPORT_FROM", user or "no-reply@example.com"),
+    }
+
+def _build_message(subject, body, to_addr, from_addr, html_body=None):
+    from email.message import EmailMessage
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = from_addr
+    msg["To"] = to_addr
+    msg.set_content(body)
+    if html_body:
+        msg.add_alternative(html_body, subtype='html')
+    return msg
+
+class SmtpSession:
+    """Conexão SMTP (STARTTLS + login, se houver credenciais, uma vez) reaproveitada para várias mensagens."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self._smtp = None
+
+    def _connect(self):
+        import smtplib
+        cfg = self.cfg
+        with span("smtp.connect", host=cfg["host"], port=cfg["port"]):
+            smtp = smtplib.SMTP(cfg["host"], cfg["port"], timeout=10)
+        try:
+            if cfg["starttls"]:
+                with span("smtp.starttls"):
+                    smtp.starttls()
+            if cfg["user"] and cfg["pwd"]:
+                with span("smtp.login"):
+                    smtp.login(cfg["user"], cfg["pwd"])
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+    def send(self, msg):
+        import smtplib
+        if self._smtp is None:
+            self._connect()
+        try:
+            with span("smtp.send", to=msg["To"]):
+                self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # O servidor encerrou a sessão ociosa; reconecta uma vez
+            self._smtp = None
+            self._connect()
+            with span("smtp.send", to=msg["To"], retry=True):
+                self._smtp.send_message(msg)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                with span("smtp.quit"):
+                    self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+def _enqueue_mail(conn, protocol, kind, to_addr, subject, body, html_body=None):
+    """Enfileira um e-mail; um por (protocolo, tipo). Retorna False se já estava na fila."""
+    with span("db.enqueue_mail", kind=kind), conn:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO mail_queue (protocol, kind, to_addr, subject, body, html_body, next_attempt_at, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (protocol, kind, to_addr, subject, body, html_body, time.time(), time.time()))
+        return cur.rowcount == 1
+
+def _claim_mail(conn, batch, protocol=None):
+    """Reserva até `batch` mensagens vencidas (status 'sending') para este worker."""
+    now = time.time()
+    sql = ("SELECT id FROM mail_queue WHERE ((status = 'pending' AND next_attempt_at <= ?)"
+           " OR (status = 'sending' AND claimed_at < ?))")
+    params = [now, now - MAIL_CLAIM_TIMEOUT]
+    if protocol:
+        sql += " AND protocol = ?"
+        params.append(protocol)
+    sql += " ORDER BY id LIMIT ?"
+    params.append(batch)
+    with span("db.claim_mail"), conn:
+        conn.execute("BEGIN IMMEDIATE")
+        ids = [r[0] for r in conn.execute(sql, params)]
+        conn.executemany("UPDATE mail_queue SET status = 'sending', claimed_at = ? WHERE id = ?", [(now, i) for i in ids])
+    if not ids:
+        return []
+    return conn.execute(f"SELECT * FROM mail_queue WHERE id IN ({', '.join('?' * len(ids))}) ORDER BY id", ids).fetchall()
+
+def _reschedule_mail(conn, row, error):
+    """Devolve a mensagem à fila com backoff exponencial; True se esgotou MAIL_MAX_ATTEMPTS."""
+    attempts = row["attempts"] + 1
+    status = "failed" if attempts >= MAIL_MAX_ATTEMPTS else "pending"
+    delay = min(MAIL_BACKOFF * 2 ** (attempts - 1), MAIL_BACKOFF_MAX)
+    with span("db.reschedule_mail"), conn:
+        conn.execute("UPDATE mail_queue SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                     (status, attempts, time.time() + delay, str(error), row["id"]))
+    if status == "failed":
+        console.print(f"[red]E-mail {row['kind']} de {row['protocol']} descartado após {attempts} tentativas:[/red] {error}")
+    return status == "failed"
+
+def _deliver_mail_queue(conn, batch=100, protocol=None):
+    """
+    Envia as mensagens vencidas da fila por uma única sessão SMTP.
+    Erro de uma mensagem (destinatário recusado, DATA rejeitado) reagenda só ela, com backoff
+    exponencial até MAIL_MAX_ATTEMPTS, e mantém a sessão. Erro de conexão ou autenticação
+    reagenda a mensagem atual, devolve o restante do lote a 'pending' e encerra a rodada:
+    com o servidor fora do ar, cada nova tentativa só somaria mais um timeout.
+    Retorna (enviadas, adiadas, descartadas).
+    """
+    import smtplib
+    cfg = _smtp_config()
+    if cfg is None:
+        console.print("[yellow]SMTP não configurado corretamente (.env). Fila mantida.[/yellow]")
+        return 0, 0, 0
+
+    sent = deferred = dropped = 0
+    session = SmtpSession(cfg)
+    try:
+        while True:
+            rows = _claim_mail(conn, batch, protocol)
+            if not rows:
+                break
+            for i, row in enumerate(rows):
+                try:
+                    msg = _build_message(row["subject"], row["body"], row["to_addr"], cfg["from_addr"], row["html_body"])
+                    session.send(msg)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, ValueError) as e:
+                    # Problema desta mensagem (ou cabeçalho inválido): a sessão segue boa
+                    if _reschedule_mail(conn, row, e):
+                        dropped += 1
+                    else:
+                        deferred += 1
+                    continue
+                except OSError as e:
+                    # Conexão/autenticação (smtplib.SMTPException herda de OSError): para o lote
+                    session.close()
+                    if _reschedule_mail(conn, row, e):
+                        dropped += 1
+                    else:
+                        deferred += 1
+                    rest = [(r["id"],) for r in rows[i + 1:]]
+                    with span("db.release_mail", count=len(rest)), conn:
+                        conn.executemany("UPDATE mail_queue SET status = 'pending', claimed_at = NULL WHERE id = ?", rest)
+                    deferred += len(rest)
+                    console.print(f"[yellow]Servidor SMTP indisponível ({e}); {len(rest) + 1} e-mail(s) de volta à fila.[/yellow]")
+                    return sent, deferred, dropped
+                with span("db.mark_sent"), conn:
+                    conn.execute("UPDATE mail_queue SET status = 'sent', attempts = attempts + 1, last_error = NULL WHERE id = ?", (row["id"],))
+                sent += 1
+    finally:
+        session.close()
+    return sent, deferred, dropped
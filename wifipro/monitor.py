@@ -0,0 +1,481 @@
+"""Monitoramento contínuo: agendador de ritmo fixo, amostragem adaptativa, métricas e painel --live."""
+
+import time
+import re
+import json
+from datetime import datetime
+
+from .common import console, PROBE_WORKERS, _split_hostport
+from .netstate import _net_state
+from .probing import _collect_samples, NativeProber
+from .stats import _get_quality_alert, _quality_green, StreamStats
+from .storage import SampleLog, SAMPLES
+
+def _run_fixed_rate(targets, interval, duration, probe, on_result, max_workers=PROBE_WORKERS,
+                    interval_of=None):
+    """
+    Agenda `probe(target)` para cada alvo em ritmo fixo, guiado pelo relógio monotônico.
+
+    Cada alvo segue a grade anchor + k*interval, então o tempo da sonda não desloca a
+    próxima medição. Se a sonda anterior do alvo ainda estiver em curso, ou se o
+    agendador ficou para trás, o tick é contado como perdido em vez de enfileirado.
+    `on_result(target, result, error)` roda na thread principal; depois dele,
+    `interval_of(target)` (opcional) pode trocar o intervalo do alvo, e a grade é
+    reancorada na última sonda disparada.
+    Retorna um dict alvo -> {"ticks": n, "missed": m}.
+    """
+    import queue
+    from concurrent.futures import ThreadPoolExecutor
+
+    done = queue.Queue()
+    start = time.monotonic()
+    end = start + duration
+    step = {t: interval for t in targets}
+    anchor = {t: start for t in targets}
+    tick = {t: 0 for t in targets}  # índice do próximo tick (evita acumular erro de ponto flutuante)
+    next_due = {t: start for t in targets}
+    fired = {t: start for t in targets}
+    running = set()
+    stats = {t: {"ticks": 0, "missed": 0} for t in targets}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets))))
+
+    try:
+        while True:
+            now = time.monotonic()
+            for t in targets:
+                due = next_due[t]
+                if due > now or due >= end:
+                    continue
+                # Ticks que passaram inteiros enquanto o agendador estava atrasado
+                late = int((now - due) // step[t])
+                stats[t]["missed"] += late
+                tick[t] += late
+                if t in running:
+                    stats[t]["missed"] += 1
+                else:
+                    running.add(t)
+                    stats[t]["ticks"] += 1
+                    fired[t] = anchor[t] + tick[t] * step[t]
+                    pool.submit(probe, t).add_done_callback(lambda f, t=t: done.put((t, f)))
+                tick[t] += 1
+                next_due[t] = anchor[t] + tick[t] * step[t]
+
+            upcoming = min(next_due.values())
+            if upcoming >= end and not running:
+                break
+            # Espera o próximo tick ou um resultado (com teto para manter o Ctrl+C responsivo)
+            wait = min(upcoming, end) - time.monotonic()
+            try:
+                t, fut = done.get(timeout=min(max(wait, 0), 0.5) if upcoming < end else 0.5)
+            except queue.Empty:
+                continue
+            while True:
+                running.discard(t)
+                err = fut.exception()
+                on_result(t, None if err else fut.result(), err)
+                new = interval_of(t) if interval_of else step[t]
+                if new != step[t]:
+                    # Nova grade a partir da última sonda; se já passou, dispara agora
+                    step[t], tick[t] = new, 1
+                    anchor[t] = max(fired[t], time.monotonic() - new)
+                    next_due[t] = anchor[t] + new
+                try:
+                    t, fut = done.get_nowait()
+                except queue.Empty:
+                    break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return stats
+
+
+class AdaptiveSampler:
+    """
+    Ritmo de sondagem por alvo guiado pela qualidade do link.
+
+    Com os limites de _get_quality_alert no verde, o intervalo cresce 1,5x por medição
+    até `max_interval` (menos tráfego em links medidos ou a bateria). Ao cruzar um
+    limite entra em rajada: 1 pacote a cada `burst_interval` segundos até a janela
+    recente voltar ao verde. Cada degradação vira um episódio com início e fim.
+    """
+
+    BACKOFF = 1.5
+    WINDOW = 20  # últimos pacotes avaliados
+
+    def __init__(self, targets, interval, max_interval, burst_interval):
+        from collections import deque
+        self.base = interval
+        self.max_interval = max(max_interval, interval)
+        self.burst_interval = burst_interval
+        self.interval = {t: interval for t in targets}
+        self.recent = {t: deque(maxlen=self.WINDOW) for t in targets}
+        self.open = {}       # alvo -> episódio em curso
+        self.episodes = []   # episódios encerrados
+
+    def packets(self, target):
+        return 1 if target in self.open else 4
+
+    def update(self, target, samples, jitter):
+        """
+        Avalia a medição e retorna ("start" | "end" | None, episódio). `jitter` é o ipdv da
+        janela de 1 min do alvo, o mesmo valor que _get_quality_alert recebe no monitor.
+        """
+        recent = self.recent[target]
+        recent.extend(rtt for _, rtt in samples)
+        rtts = [r for r in recent if r is not None]
+        loss = 100.0 * (len(recent) - len(rtts)) / len(recent) if recent else 100.0
+        mean = sum(rtts) / len(rtts) if rtts else float("inf")
+        green = _quality_green(mean, loss, jitter)
+
+        episode = self.open.get(target)
+        if episode is None:
+            if green:
+                self.interval[target] = min(self.interval[target] * self.BACKOFF, self.max_interval)
+                return None, None
+            episode = self.open[target] = {"target": target, "start": datetime.now().isoformat(timespec="seconds"),
+                                           "end": None, "worst_loss": 0.0, "worst_jitter": 0.0,
+                                           "worst_latency": 0.0, "packets": 0}
+            event = "start"
+        else:
+            event = None
+        episode["packets"] += len(samples)
+        episode["worst_loss"] = max(episode["worst_loss"], loss)
+        episode["worst_jitter"] = max(episode["worst_jitter"], jitter)
+        if rtts:
+            episode["worst_latency"] = max(episode["worst_latency"], mean)
+        if green and event is None:
+            episode["end"] = datetime.now().isoformat(timespec="seconds")
+            self.episodes.append(self.open.pop(target))
+            self.interval[target] = self.base
+            return "end", episode
+        self.interval[target] = self.burst_interval
+        return event, episode
+
+    def close(self):
+        """Encerra os episódios ainda abertos (fim do monitoramento) e retorna todos."""
+        now = datetime.now().isoformat(timespec="seconds")
+        for episode in self.open.values():
+            episode["end"] = now
+            self.episodes.append(episode)
+        self.open.clear()
+        return self.episodes
+
+
+def _print_sample(target, samples, stats):
+    """Exibe uma medição do monitor (painel rich + alerta sobre a janela de 1 min)."""
+    latencies = [rtt for _, rtt in samples if rtt is not None]
+    loss_rate = 100.0 * (len(samples) - len(latencies)) / len(samples) if samples else 100
+    current_ts = datetime.now().strftime('%H:%M:%S')
+
+    if not latencies:
+        # Falhou completamente (target não existe, firewall, etc)
+        console.print(f"[{current_ts}] [red]Falha na Medição para {target}.[/red] Perda: {loss_rate:.1f}%")
+        return
+
+    # O alerta avalia a janela deslizante, não o lote isolado de 4 pacotes
+    win = stats.snapshot("1m")
+    alert_status = _get_quality_alert(win["mean"], win["loss"], win["ipdv"])
+    avg_lat = sum(latencies) / len(latencies)
+
+    # Exibe a tabela de métricas (usa Columns da rich para um layout limpo)
+    try:
+        from rich.columns import Columns
+        from rich.panel import Panel
+        data_panel = Panel(
+            Columns([
+                f"[cyan]Latência:[/cyan] [bold white]{avg_lat:.1f}ms[/bold white] (1 min: {win['mean']:.1f}ms)",
+                f"[cyan]p95 (1 min):[/cyan] [bold white]{win['p95']:.1f}ms[/bold white]",
+                f"[cyan]Jitter:[/cyan] [bold white]{win['ipdv']:.1f}ms[/bold white]",
+                f"[cyan]Perda (1 min):[/cyan] [bold white]{win['loss']:.1f}%[/bold white]",
+            ], equal=True),
+            title=f"{target} — Métricas ({current_ts})",
+            border_style="blue"
+        )
+        console.print(data_panel)
+    except ImportError:
+        # Fallback simples
+        console.print(f"[{current_ts}] {target} Avg Lat: {avg_lat:.1f}ms | p95: {win['p95']:.1f}ms | Jitter: {win['ipdv']:.1f}ms | Loss: {win['loss']:.1f}%")
+
+    # Exibe o alerta de qualidade
+    console.print(alert_status)
+
+
+# --- Exportação de métricas (Prometheus / StatsD) ---
+
+class MonitorMetrics:
+    """
+    Métricas do monitor em formato Prometheus, com um único escritor (o laço de sondas)
+    e leitores sem trava: o scrape só copia contadores, então a sonda nunca espera por ele.
+    Opcionalmente envia cada amostra a um StatsD via UDP.
+    """
+
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)  # ms
+
+    def __init__(self, targets, statsd=None):
+        self._t = {t: {"buckets": [0] * (len(self.BUCKETS) + 1), "sum": 0.0, "packets": 0,
+                       "lost": 0, "failures": 0, "jitter": 0.0} for t in targets}
+        self._statsd = None
+        if statsd:
+            import socket
+            # Resolve uma vez: o socket segue a família do endereço (IPv4 ou IPv6) e cada
+            # envio usa o sockaddr pronto, sem consulta DNS no laço de sondas
+            host, port = _split_hostport(statsd, 8125)
+            family, _, _, _, self._statsd_addr = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+            self._statsd = socket.socket(family, socket.SOCK_DGRAM)
+            self._statsd.setblocking(False)
+
+    def observe(self, target, samples, jitter):
+        import bisect
+        m = self._t[target]
+        lines = []
+        key = self._key(target)
+        for _, rtt in samples:
+            m["packets"] += 1
+            if rtt is None:
+                m["lost"] += 1
+                lines.append(f"wifipro.{key}.lost:1|c")
+                continue
+            m["buckets"][bisect.bisect_left(self.BUCKETS, rtt)] += 1
+            m["sum"] += rtt
+            lines.append(f"wifipro.{key}.rtt:{rtt:.3f}|ms")
+        m["jitter"] = jitter
+        lines.append(f"wifipro.{key}.jitter:{jitter:.3f}|g")
+        self._push(lines)
+
+    def failure(self, target):
+        self._t[target]["failures"] += 1
+        self._push([f"wifipro.{self._key(target)}.failures:1|c"])
+
+    @staticmethod
+    def _key(target):
+        return re.sub(r"[^\w-]", "_", target)
+
+    def _push(self, lines):
+        if self._statsd is None:
+            return
+        try:
+            self._statsd.sendto("\n".join(lines).encode(), self._statsd_addr)
+        except OSError:
+            pass  # StatsD fora do ar não pode atrasar a sonda
+
+    def render(self):
+        out = [
+            "# HELP wifipro_rtt_ms Latência por pacote (ms).",
+            "# TYPE wifipro_rtt_ms histogram",
+        ]
+        rows = [(t, dict(m, buckets=list(m["buckets"]))) for t, m in list(self._t.items())]
+        for target, m in rows:
+            label = target.replace("\\", "\\\\").replace('"', '\\"')
+            acc = 0
+            for le, n in zip(self.BUCKETS + ("+Inf",), m["buckets"]):
+                acc += n
+                out.append(f'wifipro_rtt_ms_bucket{{target="{label}",le="{le}"}} {acc}')
+            out.append(f'wifipro_rtt_ms_sum{{target="{label}"}} {m["sum"]:.3f}')
+            out.append(f'wifipro_rtt_ms_count{{target="{label}"}} {acc}')
+        for name, key, kind, help_text in (
+            ("wifipro_packets_total", "packets", "counter", "Pacotes de sonda enviados."),
+            ("wifipro_packets_lost_total", "lost", "counter", "Pacotes de sonda sem resposta."),
+            ("wifipro_probe_failures_total", "failures", "counter", "Medições que falharam (DNS, socket...)."),
+            ("wifipro_jitter_ms", "jitter", "gauge", "Jitter RFC 3550 atual (ms)."),
+        ):
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for target, m in rows:
+                label = target.replace("\\", "\\\\").replace('"', '\\"')
+                out.append(f'{name}{{target="{label}"}} {m[key]:.3f}' if kind == "gauge" else f'{name}{{target="{label}"}} {m[key]}')
+        return "\n".join(out) + "\n"
+
+    def serve(self, listen):
+        """Sobe o endpoint /metrics numa thread daemon e retorna o servidor."""
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *a):
+                pass
+
+        addr = ("127.0.0.1", int(listen)) if str(listen).isdigit() else _split_hostport(listen, 9108)
+        server = ThreadingHTTPServer(addr, Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+SPARK_WIDTH = 24  # amostras no buffer circular de cada alvo
+
+class _LiveBoard:
+    """
+    Painel do `monitor --live`: uma linha por alvo com a janela de 1 min e uma sparkline
+    de um buffer circular de tamanho fixo. A rich só chama `__rich__` na taxa de refresh,
+    então o custo de cada quadro não cresce com a taxa de amostras nem com a duração.
+
+    A rich desenha numa thread própria: `update` (thread principal, a mesma que alimenta
+    as StreamStats) monta a linha de cada alvo e a publica com uma única atribuição;
+    `__rich__` só formata essas linhas prontas e nunca toca nas estatísticas.
+    """
+
+    def __init__(self, targets, series):
+        from collections import deque
+        self.series = series
+        self.spark = {t: deque(maxlen=SPARK_WIDTH) for t in targets}
+        self.rows = {t: None for t in targets}
+
+    def update(self, target, samples, error=None):
+        last = None
+        if error is None:
+            latencies = [rtt for _, rtt in samples if rtt is not None]
+            last = sum(latencies) / len(latencies) if latencies else None
+            self.spark[target].append(last)
+        elif self.rows[target] is not None:
+            last = self.rows[target]["last"]
+        self.rows[target] = {"last": last, "error": error, "win": self.series[target].snapshot("1m"),
+                             "spark": tuple(self.spark[target])}
+
+    @staticmethod
+    def _sparkline(values):
+        known = [v for v in values if v is not None]
+        if not known:
+            return "·" * len(values)
+        lo, hi = min(known), max(known)
+        span = (hi - lo) or 1
+        top = len(SPARK_CHARS) - 1
+        return "".join("·" if v is None else SPARK_CHARS[int((v - lo) / span * top)] for v in values)
+
+    def __rich__(self):
+        from rich.table import Table
+        table = Table(title=f"Monitor ao vivo — {datetime.now():%H:%M:%S}", expand=False)
+        for col in ["Alvo", "Última", "Média 1m", "p95 1m", "Jitter", "Perda 1m", "Tendência", "Estado"]:
+            table.add_column(col, no_wrap=col != "Estado")
+        fmt = lambda v, unit="ms": "-" if v is None else f"{v:.1f}{unit}"
+        for target, row in list(self.rows.items()):
+            if row is None:
+                table.add_row(target, "-", "-", "-", "-", "-", "", "[dim]aguardando[/dim]")
+                continue
+            win = row["win"]
+            if row["error"] is not None:
+                state = f"[red]erro: {str(row['error'])[:20]}[/red]"
+            elif win["mean"] is None:
+                state = "[red]sem resposta[/red]" if win["count"] else "[dim]aguardando[/dim]"
+            else:
+                alert = _get_quality_alert(win["mean"], win["loss"], win["ipdv"])
+                state = "[bold red]ALERTA[/bold red]" if "ALERTA" in alert else "[yellow]Atenção[/yellow]" if "Atenção" in alert else "[green]OK[/green]"
+            table.add_row(target, fmt(row["last"]), fmt(win["mean"]), fmt(win["p95"]), fmt(win["ipdv"]),
+                          fmt(win["loss"], "%"), self._sparkline(row["spark"]), state)
+        return table
+
+
+def cmd_monitor(args):
+    targets = args.targets or ["1.1.1.1"]
+    duration = args.duration
+    interval = args.interval
+    
+    console.print(f"[bold blue]Monitorando:[/bold blue] {', '.join(targets)} (Intervalo: {interval}s, Duração: {duration}s)")
+    sampler = AdaptiveSampler(targets, interval, args.max_interval, args.burst_interval) if args.adaptive else None
+
+    # Uma sonda nativa por alvo, criada na primeira medição e reaproveitada depois
+    probers = {}
+    # Estatísticas em janelas deslizantes por alvo (memória constante)
+    series = {t: StreamStats() for t in targets}
+    sample_log = SampleLog() if args.record else None
+
+    def probe(target):
+        # "gateway" segue o gateway padrão atual (estado em cache, sem custo por tick)
+        address = target
+        if target == "gateway":
+            address = _net_state().gateway
+            if not address:
+                raise RuntimeError("gateway padrão não encontrado")
+        prober = None
+        if args.method == "native":
+            if target not in probers or probers[target].target != address:
+                if target in probers:
+                    probers[target].close()
+                probers[target] = NativeProber(address)
+            prober = probers[target]
+        # Medição contínua. 4 pings por medição (1 por tick em rajada no modo adaptativo)
+        count = sampler.packets(target) if sampler else 4
+        return _collect_samples(address, count=count, method=args.method, prober=prober)
+
+    board = _LiveBoard(targets, series) if args.live else None
+    metrics = None
+    metrics_server = None
+    if args.serve_metrics or args.statsd:
+        metrics = MonitorMetrics(targets, statsd=args.statsd)
+        if args.serve_metrics:
+            metrics_server = metrics.serve(args.serve_metrics)
+            host, port = metrics_server.server_address[:2]
+            console.print(f"[cyan]Métricas Prometheus em[/cyan] http://{host}:{port}/metrics")
+
+    def on_result(target, result, error):
+        if error is None:
+            for _, rtt in result:
+                series[target].add(rtt)
+            if sample_log is not None:
+                sample_log.append(target, result)
+            if sampler is not None:
+                # Mesmo jitter que o alerta usa (ipdv da janela de 1 min), para o ritmo e o aviso concordarem
+                event, episode = sampler.update(target, result, series[target].snapshot("1m")["ipdv"])
+                if event == "start":
+                    console.print(f"[bold red]{episode['start']} {target}: degradação detectada, sondando a cada {args.burst_interval}s.[/bold red]")
+                elif event == "end":
+                    console.print(f"[green]{episode['end']} {target}: link normalizado (episódio desde {episode['start']}).[/green]")
+        if metrics is not None:
+            if error is None:
+                metrics.observe(target, result, series[target].jitter_rfc3550)
+            else:
+                metrics.failure(target)
+        if board is not None:
+            board.update(target, result, error)
+        elif error is not None:
+            console.print(f"[red]Erro em {target}:[/red] {error}")
+        else:
+            _print_sample(target, result, series[target])
+
+    stats = {}
+    try:
+        if board is not None:
+            # Um único display atualizado no lugar, com refresh limitado
+            from rich.live import Live
+            with Live(board, refresh_per_second=args.refresh, transient=False):
+                stats = _run_fixed_rate(targets, interval, duration, probe, on_result, max_workers=args.workers,
+                                        interval_of=sampler.interval.get if sampler else None)
+        else:
+            stats = _run_fixed_rate(targets, interval, duration, probe, on_result, max_workers=args.workers,
+                                    interval_of=sampler.interval.get if sampler else None)
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Monitoramento encerrado pelo usuário.[/bold yellow]")
+    finally:
+        for prober in probers.values():
+            prober.close()
+        if sample_log is not None:
+            sample_log.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+    for target, st in stats.items():
+        if st["missed"]:
+            console.print(f"[yellow]{target}: {st['missed']} tick(s) perdido(s) de {st['ticks'] + st['missed']}.[/yellow]")
+
+    if sampler is not None:
+        episodes = sampler.close()
+        for ep in episodes:
+            console.print(f"[yellow]Episódio {ep['target']}: {ep['start']} → {ep['end']} "
+                          f"(perda máx {ep['worst_loss']:.0f}%, jitter máx {ep['worst_jitter']:.1f}ms, {ep['packets']} pacotes)[/yellow]")
+        if episodes and args.record:
+            SAMPLES.mkdir(exist_ok=True)
+            with open(SAMPLES / "episodes.jsonl", "a", encoding="utf-8") as f:
+                for ep in episodes:
+                    f.write(json.dumps(ep, ensure_ascii=False) + "\n")
+        
+    return 0
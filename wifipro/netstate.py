@@ -0,0 +1,226 @@
+"""Estado de rede (interfaces, rotas, gateway) lido do kernel e compartilhado entre comandos."""
+
+import platform
+import sys
+import os
+import time
+import re
+import struct
+import threading
+from collections import namedtuple
+
+from .common import run
+from .trace import span
+
+# --- Estado de rede (interfaces, rotas, gateway) lido uma vez e reaproveitado ---
+
+Interface = namedtuple("Interface", "name mac mtu up addresses")
+Route = namedtuple("Route", "destination gateway iface metric")
+NetState = namedtuple("NetState", "interfaces routes gateway source read_at")
+
+NET_STATE_TTL = 5.0  # segundos
+
+def _ipv4_addresses():
+    """
+    {interface: ["a.b.c.d/plen", ...]} com um dump RTM_GETADDR via netlink: inclui endereços
+    secundários e o prefixo de cada um (o ioctl SIOCGIFADDR só devolve o primário, sem máscara).
+    """
+    import socket
+    RTM_NEWADDR, RTM_GETADDR = 20, 22
+    NLMSG_ERROR, NLMSG_DONE = 2, 3
+    NLM_F_REQUEST, NLM_F_DUMP = 0x1, 0x300
+    IFA_ADDRESS, IFA_LOCAL = 1, 2
+
+    addrs = {}
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        sock.settimeout(1.0)
+        # nlmsghdr (len, tipo, flags, seq, pid) + ifaddrmsg (família, plen, flags, escopo, índice)
+        request = struct.pack("=LHHLLBBBBI", 24, RTM_GETADDR, NLM_F_REQUEST | NLM_F_DUMP, 1, 0, socket.AF_INET, 0, 0, 0, 0)
+        sock.send(request)
+        while True:
+            data = sock.recv(65536)
+            off = 0
+            while off + 16 <= len(data):
+                length, kind = struct.unpack_from("=LH", data, off)
+                if length < 16 or kind == NLMSG_DONE:
+                    return addrs
+                if kind == NLMSG_ERROR:
+                    raise OSError("netlink: RTM_GETADDR recusado")
+                if kind == RTM_NEWADDR:
+                    _, plen, _, _, index = struct.unpack_from("=BBBBI", data, off + 16)
+                    attrs, pos = {}, off + 24
+                    while pos + 4 <= off + length:
+                        alen, atype = struct.unpack_from("=HH", data, pos)
+                        if alen < 4:
+                            break
+                        attrs[atype] = data[pos + 4:pos + alen]
+                        pos += (alen + 3) & ~3
+                    # IFA_LOCAL é o endereço da interface; em ponto a ponto IFA_ADDRESS é o do outro lado
+                    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+                    if raw and len(raw) == 4:
+                        try:
+                            name = socket.if_indextoname(index)
+                        except OSError:
+                            name = str(index)
+                        addrs.setdefault(name, []).append(f"{socket.inet_ntoa(raw)}/{plen}")
+                off += (length + 3) & ~3
+
+def _read_net_state_linux():
+    """Lê interfaces, endereços e rotas direto de /sys, /proc e netlink, sem abrir processos."""
+    import socket
+
+    v6 = {}
+    try:
+        with open("/proc/net/if_inet6") as f:
+            for line in f:
+                addr, _, plen, _, _, name = line.split()
+                full = ":".join(addr[i:i + 4] for i in range(0, 32, 4))
+                v6.setdefault(name, []).append(f"{socket.inet_ntop(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, full))}/{int(plen, 16)}")
+    except OSError:
+        pass
+
+    try:
+        v4 = _ipv4_addresses()
+    except OSError:
+        v4 = {}  # netlink indisponível (sandbox): só IPv6
+
+    interfaces = {}
+    for name in sorted(os.listdir("/sys/class/net")):
+        base = f"/sys/class/net/{name}"
+
+        def attr(key, default=""):
+            try:
+                with open(f"{base}/{key}") as f:
+                    return f.read().strip()
+            except OSError:
+                return default
+
+        flags = int(attr("flags", "0x0"), 16)
+        interfaces[name] = Interface(name, attr("address"), int(attr("mtu", "0") or 0), bool(flags & 1), v4.get(name, []) + v6.get(name, []))
+
+    def hexip(h):
+        return socket.inet_ntoa(struct.pack("<I", int(h, 16)))
+
+    routes, gateway = [], None
+    with open("/proc/net/route") as f:
+        next(f)
+        for line in f:
+            iface, dest, gw, flags, _, _, metric, mask = line.split()[:8]
+            plen = bin(int(mask, 16)).count("1")
+            route = Route(f"{hexip(dest)}/{plen}", hexip(gw) if int(flags, 16) & 2 else None, iface, int(metric))
+            routes.append(route)
+            if plen == 0 and route.gateway and (gateway is None or route.metric < gateway[1]):
+                gateway = (route.gateway, route.metric)
+    return list(interfaces.values()), routes, gateway[0] if gateway else None
+
+def _read_net_state_fallback():
+    """Outros sistemas: uma única chamada a ipconfig/ifconfig (+ netstat no macOS/BSD), interpretada."""
+    if platform.system() == "Windows":
+        code, out, err = run("ipconfig /all")
+        gw = re.search(r"(?:Default Gateway|Gateway Padrão)[ .]*:\s*(\d{1,3}(?:\.\d{1,3}){3})", out)
+        gateway = gw.group(1) if gw else None
+    else:
+        code, out, err = run("ifconfig || ip a", shell=True)
+        _, routes_out, _ = run(["netstat", "-rn"], shell=False)
+        gw = re.search(r"^(?:default|0\.0\.0\.0)\s+(\d{1,3}(?:\.\d{1,3}){3})", routes_out, re.M)
+        gateway = gw.group(1) if gw else None
+    interfaces = [Interface(name, "", 0, True, addrs) for name, addrs in _parse_interfaces(out).items()]
+    return interfaces, [], gateway
+
+class _NetStateCache:
+    """
+    Snapshot do estado de rede com TTL curto. No Linux um socket netlink (não bloqueante)
+    avisa mudanças de link, endereço ou rota e invalida o cache na hora. A leitura é
+    serializada por um lock: as threads do monitor consultam o mesmo cache.
+    """
+
+    def __init__(self, ttl=NET_STATE_TTL):
+        self.ttl = ttl
+        self._state = None
+        self._lock = threading.Lock()
+        self._netlink = None
+        if sys.platform.startswith("linux"):
+            import socket
+            try:
+                # RTMGRP_LINK | IPV4_IFADDR | IPV4_ROUTE | IPV6_IFADDR | IPV6_ROUTE
+                self._netlink = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+                self._netlink.bind((0, 0x1 | 0x10 | 0x40 | 0x100 | 0x400))
+                self._netlink.setblocking(False)
+            except OSError:
+                self._netlink = None
+
+    def _changed(self):
+        changed = False
+        while self._netlink is not None:
+            try:
+                self._netlink.recv(65536)
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                changed = True  # buffer estourado: muitas mudanças
+                break
+        return changed
+
+    def get(self):
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._state is None or self._changed() or now - self._state.read_at > self.ttl:
+            with span("netstate.read"):
+                if sys.platform.startswith("linux") and os.path.exists("/proc/net/route"):
+                    interfaces, routes, gateway = _read_net_state_linux()
+                    source = "proc"
+                else:
+                    interfaces, routes, gateway = _read_net_state_fallback()
+                    source = "shell"
+            self._state = NetState(interfaces, routes, gateway, source, now)
+        return self._state
+
+_NET_STATE = None
+_NET_STATE_LOCK = threading.Lock()
+
+def _net_state():
+    """Estado de rede atual (compartilhado por status, diagnose e monitor; seguro entre threads)."""
+    global _NET_STATE
+    if _NET_STATE is None:
+        with _NET_STATE_LOCK:
+            if _NET_STATE is None:
+                _NET_STATE = _NetStateCache()
+    return _NET_STATE.get()
+
+def _net_state_text(state):
+    """Texto legível do estado de rede (relatórios e fallback sem rich)."""
+    lines = []
+    for i in state.interfaces:
+        lines.append(f"{i.name}: {'UP' if i.up else 'DOWN'}" + (f"  mtu {i.mtu}" if i.mtu else "") + (f"  mac {i.mac}" if i.mac else ""))
+        lines += [f"    {addr}" for addr in i.addresses]
+    lines.append(f"Gateway padrão: {state.gateway or '-'}")
+    for r in state.routes:
+        lines.append(f"Rota {r.destination} " + (f"via {r.gateway}" if r.gateway else "direta") + f" ({r.iface}, métrica {r.metric})")
+    return "\n".join(lines)
+
+def _parse_interfaces(text):
+    """
+    Extrai {interface: [endereços]} da saída de `ip a`, `ifconfig` ou `ipconfig /all`
+    (Windows em português ou inglês).
+    """
+    interfaces = {}
+    current = None
+    for line in text.splitlines():
+        header = (re.match(r"^\d+:\s+([^:@\s]+)[@:]", line)            # ip a
+                  or re.match(r"^([^\s:]+):\s+flags=", line)            # ifconfig
+                  or re.match(r"^(?:\S.*\s)?(?:adapter|Adaptador)\s+(.+):\s*$", line))  # ipconfig
+        if header:
+            current = header.group(1).strip()
+            interfaces.setdefault(current, [])
+            continue
+        if current is None:
+            continue
+        addr = (re.match(r"^\s+inet6?\s+([0-9a-fA-F:.]+(?:/\d+)?)", line)
+                or re.match(r"^\s+(?:IPv[46] Address|Endereço IPv[46]|Link-local IPv6 Address|Endereço IPv6 de link local)[ .]*:\s*([0-9a-fA-F:.%]+)", line))
+        if addr:
+            interfaces[current].append(addr.group(1))
+    return interfaces
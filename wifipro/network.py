@@ -0,0 +1,190 @@
+"""Comandos de rede: status, ping, diagnose, report query e fix."""
+
+import platform
+import time
+import re
+import json
+from datetime import datetime
+
+from .common import console, DEFAULT_TARGETS, _iter_probes, _parse_when, _ping_cmd, PROBE_TIMEOUT, PROBE_WORKERS, REPORTS, run, _run_probes
+from .netstate import _net_state, _net_state_text
+from .probing import _parse_ping_output
+from .stats import _aggregate
+from .trace import span
+
+def cmd_status(args):
+    os_name = platform.system()
+    state = _net_state()
+    try:
+        from rich.table import Table
+        table = Table(title=f"Status de Rede ({os_name}) — gateway: {state.gateway or '-'}")
+        for col in ["Interface", "Estado", "MAC", "MTU", "Endereços"]:
+            table.add_column(col)
+        for i in state.interfaces:
+            table.add_row(i.name, "UP" if i.up else "DOWN", i.mac or "-", str(i.mtu or "-"), "\n".join(i.addresses) or "-")
+        console.print(table)
+    except ImportError:
+        console.print(_net_state_text(state))
+    return 0
+
+def cmd_ping(args):
+    targets = args.targets or DEFAULT_TARGETS
+    # Todos os alvos são pingados em paralelo; a saída mantém a ordem pedida
+    results = _run_probes([(t, _ping_cmd(t)) for t in targets], max_workers=args.workers, timeout=args.timeout)
+    for t in targets:
+        code, out, err, elapsed = results[t]
+        console.print(f"[bold]Ping:[/bold] {t} ({elapsed:.1f}s)")
+        if code == 0:
+            console.print(out)
+        else:
+            console.print(f"[red]Falhou:[/red] {err or out}")
+    return 0
+
+def _parse_nslookup(text):
+    """Extrai os endereços resolvidos da saída do `nslookup` (ignora o servidor consultado)."""
+    m = re.search(r"^(?:Name|Nome):", text, re.M)
+    if not m:
+        return []
+    return re.findall(r"(?<![\w:.])(\d{1,3}(?:\.\d{1,3}){3}|[0-9a-fA-F]*:[0-9a-fA-F:]+)(?![\w:.])", text[m.end():])
+
+def _diagnose_sections(workers=PROBE_WORKERS, timeout=PROBE_TIMEOUT):
+    """
+    Coleta o diagnóstico local como seções estruturadas (dicts), entregues assim que
+    cada sonda termina: "meta", "status" (interfaces), "ping" (RTTs e perda) e "dns".
+    O ping do gateway leva "role": "gateway", já que o endereço muda de uma rede para outra.
+    """
+    yield {"section": "meta", "ts": datetime.now().isoformat(timespec="seconds"), "host": platform.node(),
+           "system": platform.platform(), "python": platform.python_version()}
+
+    # Interfaces e gateway vêm do estado de rede compartilhado (sem processo no Linux)
+    t0 = time.monotonic()
+    state = _net_state()
+    yield {"section": "status", "code": 0, "elapsed": round(time.monotonic() - t0, 3), "source": state.source,
+           "interfaces": {i.name: i.addresses for i in state.interfaces}, "gateway": state.gateway,
+           "routes": [r._asdict() for r in state.routes], "raw": _net_state_text(state)}
+
+    # Pings (incluindo o gateway) e DNS rodam todos em paralelo
+    targets = ([state.gateway] if state.gateway else []) + DEFAULT_TARGETS
+    jobs = [(f"ping:{t}", _ping_cmd(t)) for t in targets]
+    jobs.append(("nslookup", ["nslookup", "google.com"]))
+
+    for key, (code, out, err, elapsed) in _iter_probes(jobs, max_workers=workers, timeout=timeout):
+        raw = out or err
+        base = {"code": code, "elapsed": round(elapsed, 3)}
+        if key == "nslookup":
+            yield {"section": "dns", "name": "google.com", **base, "addresses": _parse_nslookup(out), "raw": raw}
+        else:
+            rtts, loss = _parse_ping_output(out + "\n" + err)
+            target = key.split(":", 1)[1]
+            role = {"role": "gateway"} if target == state.gateway else {}
+            yield {"section": "ping", "target": target, **role, **base, "rtts": rtts, "loss": loss, "raw": raw}
+
+def _section_text(sec):
+    """Bloco de texto do relatório legível (.txt) para uma seção estruturada."""
+    if sec["section"] == "meta":
+        return f"Sistema: {sec['system']} | Python: {sec['python']}"
+    if sec["section"] == "status":
+        return "\n=== STATUS DE REDE ===\n" + sec["raw"]
+    if sec["section"] == "ping":
+        role = f" ({sec['role']})" if sec.get("role") else ""
+        return f"\n=== PING {sec['target']}{role} ===\n" + sec["raw"]
+    if sec["section"] == "dns":
+        return f"\n=== NSLOOKUP {sec['name']} ===\n" + sec["raw"]
+    return ""
+
+def _sort_sections(sections):
+    """Ordena as seções na ordem clássica do relatório (sistema, status, pings, DNS)."""
+    order = {"meta": 0, "status": 1, "ping": 2, "dns": 3}
+    pings = {t: i for i, t in enumerate(DEFAULT_TARGETS)}
+    return sorted(sections, key=lambda sec: (order.get(sec["section"], 9), pings.get(sec.get("target"), -1)))
+
+def _diagnose_blocks(workers=PROBE_WORKERS, timeout=PROBE_TIMEOUT):
+    """Blocos de texto do diagnóstico local, na ordem clássica do relatório."""
+    return [_section_text(sec) for sec in _sort_sections(_diagnose_sections(workers, timeout))]
+
+def cmd_diagnose(args):
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    REPORTS.mkdir(exist_ok=True)
+    report = REPORTS / f"diagnostico-{ts}.txt"
+    structured = REPORTS / f"diagnostico-{ts}.jsonl"
+
+    # Cada seção vai para o .jsonl assim que termina: uma sonda travada não perde as demais
+    t0 = time.monotonic()
+    sections = []
+    with open(structured, "w", encoding="utf-8") as f:
+        for sec in _diagnose_sections(args.workers, args.timeout):
+            with span("report.write", section=sec.get("section")):
+                f.write(json.dumps(sec, ensure_ascii=False) + "\n")
+                f.flush()
+            sections.append(sec)
+        elapsed = time.monotonic() - t0
+        f.write(json.dumps({"section": "end", "elapsed": round(elapsed, 3)}) + "\n")
+
+    with span("report.write", path=report.name):
+        report.write_text("\n\n".join(_section_text(sec) for sec in _sort_sections(sections)), encoding="utf-8")
+    console.print(f"[green]Relatório salvo em:[/green] {report} ({elapsed:.1f}s)")
+    console.print(f"[green]Relatório estruturado:[/green] {structured}")
+    return 0
+
+def cmd_report_query(args):
+    since = _parse_when(args.since, datetime.fromtimestamp(0))
+    until = _parse_when(args.until, datetime.now())
+    # O prefixo da linha identifica a seção sem precisar decodificar o JSON
+    marker = f'{{"section": "{args.section}"'
+
+    t0 = time.perf_counter()
+    groups = {}
+    scanned = 0
+    for path in sorted(REPORTS.glob("diagnostico-*.jsonl")):
+        try:
+            ts = datetime.strptime(path.stem.split("-", 1)[1], "%Y%m%d-%H%M%S")
+        except ValueError:
+            continue
+        if not since <= ts <= until:
+            continue
+        scanned += 1
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.startswith(marker):
+                    continue
+                sec = json.loads(line)
+                target = sec.get("target") or sec.get("name") or ""
+                if args.target and args.target not in (target, sec.get("role")):
+                    continue
+                if args.metric == "rtt":
+                    vals = sec.get("rtts", [])
+                else:
+                    vals = [sec[args.metric]] if sec.get(args.metric) is not None else []
+                groups.setdefault(target if args.by_target else "*", []).extend(vals)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    if not groups:
+        console.print(f"[yellow]Nenhum dado em {scanned} relatório(s).[/yellow]")
+        return 1
+    for target, vals in sorted(groups.items()):
+        result = _aggregate(vals, args.agg)
+        shown = "-" if result is None else (str(result) if args.agg == "count" else f"{result:.2f}")
+        label = args.target or "todos" if target == "*" else target
+        console.print(f"{args.agg}({args.metric}) — {args.section} {label}: [bold]{shown}[/bold] ({len(vals)} valores)")
+    console.print(f"[cyan]{scanned} relatório(s) em {elapsed_ms:.0f}ms[/cyan]")
+    return 0
+
+def cmd_fix(args):
+    if platform.system() != "Windows":
+        console.print("[yellow]No momento, 'fix' implementado apenas no Windows.[/yellow]")
+        return 0
+
+    if args.flushdns:
+        console.print("[bold]Executando:[/bold] ipconfig /flushdns")
+        run("ipconfig /flushdns")
+
+    if args.winsock:
+        console.print("[bold]Executando:[/bold] netsh winsock reset (requer reiniciar)")
+        # Isso precisa ser executado com privilégios de administrador
+        run("netsh winsock reset") 
+
+    if not args.flushdns and not args.winsock:
+        console.print("[cyan]Nada a fazer. Use --flushdns e/ou --winsock[/cyan]")
+    else:
+        console.print("[green]Concluído. Reinicie o PC se solicitado.[/green]")
+    return 0
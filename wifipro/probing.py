@@ -0,0 +1,218 @@
+"""Sondas de latência: NativeProber (ICMP/UDP/TCP em processo) e parsing da saída do ping."""
+
+import platform
+import time
+import re
+import struct
+
+from .common import run
+from .trace import span
+
+class NativeProber:
+    """
+    Sonda de latência em processo (sem fork de `ping` e sem depender do idioma do SO).
+
+    Métodos: "icmp" (socket ICMP datagrama sem privilégios, quando o kernel permite),
+    "udp" (RTT até o eco ou o ICMP port-unreachable) e "tcp" (tempo do connect).
+    "auto" tenta ICMP e cai para TCP. Mantém o socket aberto entre amostras.
+    """
+
+    UDP_PORT = 33434  # porta alta típica do traceroute (espera port-unreachable)
+    TCP_PORT = 443
+
+    def __init__(self, target, method="auto", port=None, timeout=1.0):
+        import socket
+        self.target = target
+        self.timeout = timeout
+        self._seq = 0
+        self._sock = None
+        info = socket.getaddrinfo(target, None, type=socket.SOCK_DGRAM)[0]
+        self.family, self.addr = info[0], info[4][0]
+
+        if method == "auto":
+            try:
+                self._open_icmp()
+                method = "icmp"
+            except OSError:
+                method = "tcp"
+        elif method == "icmp":
+            self._open_icmp()
+        elif method == "udp":
+            self._sock = socket.socket(self.family, socket.SOCK_DGRAM)
+            self._sock.connect((self.addr, port or self.UDP_PORT))
+        elif method != "tcp":
+            raise ValueError(f"Método de sonda desconhecido: {method}")
+        self.method = method
+        self.port = port or (self.UDP_PORT if method == "udp" else self.TCP_PORT)
+
+    def _open_icmp(self):
+        import socket
+        proto = socket.IPPROTO_ICMPV6 if self.family == socket.AF_INET6 else socket.IPPROTO_ICMP
+        self._sock = socket.socket(self.family, socket.SOCK_DGRAM, proto)
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _checksum(data):
+        if len(data) % 2:
+            data += b"\0"
+        total = sum(int.from_bytes(data[i:i + 2], "big") for i in range(0, len(data), 2))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
+
+    def _icmp_once(self, seq):
+        import select
+        import socket
+        v6 = self.family == socket.AF_INET6
+        req_type, rep_type = (128, 129) if v6 else (8, 0)
+        payload = b"wifi-pro" + seq.to_bytes(2, "big")
+        header = struct.pack("!BBHHH", req_type, 0, 0, 0, seq)
+        csum = self._checksum(header + payload)
+        packet = struct.pack("!BBHHH", req_type, 0, csum, 0, seq) + payload
+
+        t0 = time.perf_counter_ns()
+        self._sock.sendto(packet, (self.addr, 0))
+        deadline = t0 + int(self.timeout * 1e9)
+        while True:
+            left = (deadline - time.perf_counter_ns()) / 1e9
+            if left <= 0 or not select.select([self._sock], [], [], left)[0]:
+                return None
+            data = self._sock.recv(2048)
+            t1 = time.perf_counter_ns()
+            # Linux entrega só o ICMP; macOS inclui o cabeçalho IPv4
+            if not v6 and len(data) >= 20 and data[0] >> 4 == 4:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) >= 8:
+                r_type, _, _, _, r_seq = struct.unpack("!BBHHH", data[:8])
+                if r_type == rep_type and r_seq == seq:
+                    return (t1 - t0) / 1e6
+
+    def _udp_once(self, seq):
+        import select
+        t0 = time.perf_counter_ns()
+        try:
+            self._sock.send(b"wifi-pro" + seq.to_bytes(2, "big"))
+            if not select.select([self._sock], [], [], self.timeout)[0]:
+                return None
+            self._sock.recv(2048)
+        except ConnectionRefusedError:
+            pass  # ICMP port-unreachable também é uma resposta do host
+        except OSError:
+            return None
+        return (time.perf_counter_ns() - t0) / 1e6
+
+    def _tcp_once(self, seq):
+        import socket
+        s = socket.socket(self.family, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        t0 = time.perf_counter_ns()
+        try:
+            s.connect((self.addr, self.port))
+        except ConnectionRefusedError:
+            pass  # RST também mede a ida e volta
+        except OSError:
+            return None
+        finally:
+            s.close()
+        return (time.perf_counter_ns() - t0) / 1e6
+
+    def probe(self, count=4, interval=0.2):
+        """
+        Envia `count` sondas espaçadas por `interval` segundos.
+        Retorna uma lista de (timestamp_us, rtt_ms) com rtt_ms=None para pacotes perdidos.
+        """
+        once = {"icmp": self._icmp_once, "udp": self._udp_once, "tcp": self._tcp_once}[self.method]
+        samples = []
+        with span("probe", target=self.target, method=self.method, count=count):
+            for i in range(count):
+                if i:
+                    time.sleep(interval)
+                self._seq = (self._seq + 1) & 0xFFFF
+                ts_us = time.time_ns() // 1000
+                samples.append((ts_us, once(self._seq)))
+        return samples
+
+
+def _parse_ping_output(out):
+    """
+    Extrai RTTs (ms) e perda (%) da saída textual do `ping`.
+    Entende Unix (`time=`), Windows pt (`tempo=`) e Windows en (`time=`/`time<1ms`).
+    """
+    matches = re.findall(r"(?:time|tempo)[=<](\d+(?:[.,]\d+)?)\s*ms", out)
+    latencies = [float(m.replace(",", ".")) for m in matches]
+    loss_match = re.search(r"(\d+(?:[.,]\d+)?)%\s*(?:packet loss|de perda|perda|loss)", out)
+    loss_rate = float(loss_match.group(1).replace(",", ".")) if loss_match else 100
+    return latencies, loss_rate
+
+
+def _latency_stats(latencies, loss_rate):
+    """Calcula (min, avg, max, loss, jitter, code) a partir dos RTTs válidos."""
+    if not latencies:
+        return None, None, None, loss_rate, None, 1
+
+    min_lat = min(latencies)
+    max_lat = max(latencies)
+    avg_lat = sum(latencies) / len(latencies)
+
+    # Cálculo do Jitter (variação média entre latências consecutivas)
+    jitter = 0
+    if len(latencies) > 1:
+        diffs = [abs(latencies[i] - latencies[i-1]) for i in range(1, len(latencies))]
+        jitter = sum(diffs) / len(diffs)
+
+    return min_lat, avg_lat, max_lat, loss_rate, jitter, 0
+
+
+def _collect_samples(target, count=4, method="native", prober=None):
+    """
+    Coleta `count` amostras por pacote: lista de (timestamp_us, rtt_ms | None).
+
+    Por padrão usa o NativeProber (reaproveitável via `prober`); com
+    method="ping" executa o binário do sistema e interpreta a saída.
+    """
+    if method == "ping":
+        ping_command = ["ping"]
+        if platform.system() == "Windows":
+            # -n para count, -w para timeout em milissegundos
+            ping_command += ["-n", str(count), "-w", "1000"]
+        else:
+            # -c para count, -i para intervalo de 0.2 segundos para ser mais rápido
+            ping_command += ["-c", str(count), "-i", "0.2"]
+        ping_command.append(target)
+
+        ts_us = time.time_ns() // 1000
+        code, out, err = run(ping_command, shell=False)
+        latencies, _ = _parse_ping_output(out + "\n" + err)
+        latencies = latencies[:count]
+        # O ping textual não diz quais pacotes se perderam; completa com perdas no fim
+        return [(ts_us, rtt) for rtt in latencies] + [(ts_us, None)] * (count - len(latencies))
+
+    try:
+        if prober is not None:
+            return prober.probe(count)
+        with NativeProber(target) as p:
+            return p.probe(count)
+    except OSError:
+        # Falha de resolução de nome ou de socket: conta tudo como perdido
+        return [(time.time_ns() // 1000, None)] * count
+
+
+def _measure_latency(target, count=4, method="native", prober=None):
+    """
+    Mede a latência, perda de pacotes e jitter para um alvo.
+    Retorna (min_lat, avg_lat, max_lat, loss_rate, jitter, code).
+    """
+    samples = _collect_samples(target, count, method, prober)
+    latencies = [rtt for _, rtt in samples if rtt is not None]
+    loss_rate = 100.0 * (len(samples) - len(latencies)) / len(samples) if samples else 100
+    return _latency_stats(latencies, loss_rate)
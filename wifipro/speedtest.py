@@ -0,0 +1,203 @@
+"""Teste de vazão: speedtest-cli e motor próprio multi-stream (speedtest serve / run)."""
+
+import sys
+import os
+import time
+
+from .common import console, run, SPEED_PORT, _split_hostport
+from .stats import _aggregate
+
+def cmd_speedtest(args):
+    # Sem servidor próprio: teste pela internet via speedtest-cli
+    # Usa sys.executable para garantir que o speedtest-cli seja executado no ambiente correto
+    code, out, err = run(f"{sys.executable} -m speedtest --simple")
+    if code != 0:
+        console.print("[yellow]Instale o speedtest-cli: pip install speedtest-cli (ou use 'speedtest run SERVIDOR')[/yellow]")
+        console.print(f"[red]Erro:[/red] {err or out}")
+        return code
+    try:
+        from rich.panel import Panel
+        console.print(Panel(out, title="Speedtest"))
+    except ImportError:
+        console.print(out)
+    return 0
+
+SPEED_CHUNK = 256 * 1024         # buffer de envio/recepção por stream
+SPEED_FILE_SIZE = 8 * 1024 * 1024  # arquivo servido via sendfile (download)
+
+def cmd_speedtest_serve(args):
+    import socket
+    import socketserver
+    import tempfile
+
+    # Download sai de um arquivo temporário via sendfile (zero-cópia); upload é lido e descartado
+    payload = tempfile.TemporaryFile()
+    payload.write(os.urandom(SPEED_FILE_SIZE))
+    payload.flush()
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            sock = self.request
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Cabeçalho "<modo>\n" lido por inteiro: um "\n" esquecido no stream seria ecoado no
+            # modo P e cada RTT leria o eco anterior
+            header = b""
+            while len(header) < 2:
+                chunk = sock.recv(2 - len(header))
+                if not chunk:
+                    return
+                header += chunk
+            mode = header[:1]
+            try:
+                if mode == b"D":
+                    with open(payload.fileno(), "rb", closefd=False) as f:
+                        while True:
+                            sock.sendfile(f, 0)
+                elif mode == b"U":
+                    buf = memoryview(bytearray(SPEED_CHUNK))
+                    while sock.recv_into(buf):
+                        pass
+                elif mode == b"P":
+                    # Eco de 1 byte para medir latência sob carga
+                    while True:
+                        b = sock.recv(1)
+                        if not b:
+                            break
+                        sock.sendall(b)
+            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+                pass
+
+    class Server(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    server = Server((args.bind, args.port), Handler)
+    console.print(f"[bold blue]Servidor de vazão[/bold blue] em {args.bind}:{server.server_address[1]} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Servidor encerrado pelo usuário.[/bold yellow]")
+    finally:
+        server.server_close()
+        payload.close()
+    return 0
+
+def _speed_connect(addr, mode, timeout=5):
+    import socket
+    sock = socket.create_connection(addr, timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(mode + b"\n")
+    return sock
+
+def _speed_latency(addr, stop, out, interval=0.1):
+    """Mede RTT por eco de 1 byte numa conexão à parte até `stop` ser sinalizado."""
+    try:
+        sock = _speed_connect(addr, b"P")
+    except OSError:
+        return
+    try:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            sock.sendall(b"x")
+            if not sock.recv(1):
+                break
+            out.append((time.perf_counter() - t0) * 1000)
+            stop.wait(interval)
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+def _speed_run(addr, direction, streams, duration):
+    """
+    Roda `streams` conexões TCP em paralelo por `duration` segundos.
+    Retorna (amostras Mbps por segundo, RTTs em ms sob carga).
+    """
+    import threading
+    stop = threading.Event()
+    counters = [0] * streams
+    socks = []
+
+    def worker(i, sock):
+        buf = memoryview(bytearray(SPEED_CHUNK))
+        try:
+            while not stop.is_set():
+                n = sock.recv_into(buf) if direction == "download" else sock.send(buf)
+                if not n:
+                    break
+                counters[i] += n
+        except OSError:
+            pass
+
+    mode = b"D" if direction == "download" else b"U"
+    threads = []
+    for i in range(streams):
+        sock = _speed_connect(addr, mode)
+        socks.append(sock)
+        threads.append(threading.Thread(target=worker, args=(i, sock), daemon=True))
+    rtts = []
+    threads.append(threading.Thread(target=_speed_latency, args=(addr, stop, rtts), daemon=True))
+    for t in threads:
+        t.start()
+
+    samples = []
+    start = time.monotonic()
+    last_total, last_t = 0, start
+    for k in range(1, int(duration) + 1):
+        # Amostragem em grade fixa de 1 s (sem deriva)
+        time.sleep(max(0, start + k - time.monotonic()))
+        now, total = time.monotonic(), sum(counters)
+        samples.append((total - last_total) * 8 / (now - last_t) / 1e6)
+        last_total, last_t = total, now
+    stop.set()
+    for sock in socks:
+        try:
+            sock.shutdown(2)
+        except OSError:
+            pass
+        sock.close()
+    for t in threads:
+        t.join(timeout=2)
+    return samples, rtts
+
+def _fmt_ms(value):
+    return "-" if value is None else f"{value:.2f}ms"
+
+def cmd_speedtest_run(args):
+    addr = _split_hostport(args.server, SPEED_PORT)
+    directions = ["download", "upload"] if args.direction == "both" else [args.direction]
+    stream_counts = [args.streams]
+    if args.scale:
+        stream_counts = sorted({1 << i for i in range(args.streams.bit_length()) if 1 << i <= args.streams} | {args.streams})
+
+    # Latência ociosa (referência para o bufferbloat)
+    import threading
+    idle = []
+    stop = threading.Event()
+    t = threading.Thread(target=_speed_latency, args=(addr, stop, idle, 0.05), daemon=True)
+    t.start()
+    time.sleep(1)
+    stop.set()
+    t.join(timeout=2)
+    if not idle:
+        console.print(f"[red]Erro:[/red] servidor {addr[0]}:{addr[1]} não respondeu (rode 'speedtest serve' no destino)")
+        return 1
+    idle50 = _aggregate(idle, "median")
+    console.print(f"[bold blue]Vazão:[/bold blue] {addr[0]}:{addr[1]} | latência ociosa p50 {idle50:.2f}ms")
+
+    for direction in directions:
+        for n in stream_counts:
+            try:
+                samples, rtts = _speed_run(addr, direction, n, args.duration)
+            except OSError as e:
+                console.print(f"[red]Erro em {direction} ({n} streams):[/red] {e}")
+                return 1
+            # O primeiro segundo (slow start do TCP) fica fora da média quando há amostras suficientes
+            steady = samples[1:] if len(samples) > 2 else samples
+            mean = sum(steady) / len(steady) if steady else 0
+            loaded50 = _aggregate(rtts, "median")
+            bloat = f"{loaded50 - idle50:+.2f}ms" if loaded50 is not None else "-"
+            console.print(f"[cyan]{direction}[/cyan] {n} stream(s): [bold]{mean:.1f} Mbps[/bold] | "
+                          f"latência sob carga p50 {_fmt_ms(loaded50)} p95 {_fmt_ms(_aggregate(rtts, 'p95'))} (bufferbloat {bloat})")
+            console.print("  por segundo (Mbps): " + " ".join(f"{v:.0f}" for v in samples))
+    return 0
@@ -0,0 +1,228 @@
+"""Estatísticas de latência em streaming (sketch de quantis, janelas deslizantes) e limites de qualidade."""
+
+import time
+import math
+
+
+def _aggregate(values, agg):
+    """Agregação simples sobre uma lista de números (count, mean, median, p95, min, max)."""
+    if agg == "count":
+        return len(values)
+    if not values:
+        return None
+    if agg == "mean":
+        return sum(values) / len(values)
+    if agg == "min":
+        return min(values)
+    if agg == "max":
+        return max(values)
+    values = sorted(values)
+    q = 0.5 if agg == "median" else 0.95
+    pos = q * (len(values) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+class QuantileSketch:
+    """
+    Histograma logarítmico esparso (estilo DDSketch) com erro relativo fixo.
+    A memória é limitada pelo número de faixas entre QMIN e QMAX, nunca pelo de amostras.
+    """
+
+    GAMMA = 1.02           # ~1% de erro relativo
+    QMIN, QMAX = 0.001, 100_000.0  # faixa útil em ms
+    _LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self):
+        self.bins = {}
+        self.count = 0
+
+    def _index(self, value):
+        value = min(max(value, self.QMIN), self.QMAX)
+        return math.ceil(math.log(value) / self._LOG_GAMMA)
+
+    def add(self, value, n=1):
+        i = self._index(value)
+        self.bins[i] = self.bins.get(i, 0) + n
+        self.count += n
+
+    def merge(self, other, sign=1):
+        """Soma (ou subtrai, com sign=-1) as faixas de outro sketch."""
+        for i, n in other.bins.items():
+            left = self.bins.get(i, 0) + sign * n
+            if left:
+                self.bins[i] = left
+            else:
+                self.bins.pop(i, None)
+        self.count += sign * other.count
+
+    def quantile(self, q):
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if seen > rank:
+                return 2 * self.GAMMA ** i / (self.GAMMA + 1)
+        return None
+
+
+class _Bucket:
+    """Acumuladores de uma fatia de tempo de uma janela deslizante."""
+
+    __slots__ = ("epoch", "count", "lost", "rtt_sum", "ipdv_sum", "ipdv_n", "sketch")
+
+    def __init__(self, epoch=-1):
+        self.epoch = epoch
+        self.count = self.lost = self.ipdv_n = 0
+        self.rtt_sum = self.ipdv_sum = 0.0
+        self.sketch = QuantileSketch()
+
+
+class RollingWindow:
+    """
+    Janela deslizante de `span` segundos dividida em `slots` fatias.
+    Cada amostra custa O(1); ao girar, a fatia vencida é subtraída dos totais.
+    """
+
+    def __init__(self, span, slots=60):
+        self.span = span
+        self.width = span / slots
+        self._slots = [_Bucket() for _ in range(slots)]
+        self._total = _Bucket()
+        self._epoch = None
+
+    def _advance(self, now):
+        epoch = int(now // self.width)
+        if self._epoch is not None and epoch <= self._epoch:
+            return
+        n = len(self._slots)
+        first = epoch - n + 1 if self._epoch is None else max(self._epoch + 1, epoch - n + 1)
+        for e in range(first, epoch + 1):
+            slot = self._slots[e % n]
+            if slot.epoch >= 0:
+                t = self._total
+                t.count -= slot.count
+                t.lost -= slot.lost
+                t.rtt_sum -= slot.rtt_sum
+                t.ipdv_sum -= slot.ipdv_sum
+                t.ipdv_n -= slot.ipdv_n
+                t.sketch.merge(slot.sketch, sign=-1)
+                if t.count == 0:
+                    # Zera somas para não acumular erro de ponto flutuante
+                    t.rtt_sum = t.ipdv_sum = 0.0
+            self._slots[e % n] = _Bucket(e)
+        self._epoch = epoch
+
+    def add(self, now, rtt, diff=None):
+        self._advance(now)
+        slot = self._slots[self._epoch % len(self._slots)]
+        for b in (slot, self._total):
+            b.count += 1
+            if rtt is None:
+                b.lost += 1
+                continue
+            b.rtt_sum += rtt
+            b.sketch.add(rtt)
+            if diff is not None:
+                b.ipdv_sum += diff
+                b.ipdv_n += 1
+
+    def snapshot(self, now):
+        """
+        Resumo da janela em `now` sem alterar o estado: fatias já vencidas são descontadas
+        numa cópia dos totais. Só `add` gira a janela, então uma leitura nunca corrompe os totais.
+        """
+        t = self._total
+        count, lost, rtt_sum, ipdv_sum, ipdv_n, sketch = t.count, t.lost, t.rtt_sum, t.ipdv_sum, t.ipdv_n, t.sketch
+        if self._epoch is not None:
+            oldest = int(now // self.width) - len(self._slots)
+            expired = [b for b in self._slots if 0 <= b.epoch <= oldest]
+            if expired:
+                sketch = QuantileSketch()
+                sketch.merge(t.sketch)
+                for b in expired:
+                    count -= b.count
+                    lost -= b.lost
+                    rtt_sum -= b.rtt_sum
+                    ipdv_sum -= b.ipdv_sum
+                    ipdv_n -= b.ipdv_n
+                    sketch.merge(b.sketch, sign=-1)
+        received = count - lost
+        return {
+            "count": count,
+            "loss": 100.0 * lost / count if count else None,
+            "mean": rtt_sum / received if received else None,
+            "ipdv": ipdv_sum / ipdv_n if ipdv_n else 0.0,
+            "p50": sketch.quantile(0.50),
+            "p95": sketch.quantile(0.95),
+            "p99": sketch.quantile(0.99),
+        }
+
+
+class StreamStats:
+    """
+    Estatísticas contínuas por alvo: janelas de 1 min, 5 min e 1 h com média, perda,
+    p50/p95/p99 e "ipdv" (média de |ΔRTT| entre respostas consecutivas, como o IPDV da
+    RFC 5481), além do jitter RFC 3550 da sessão (J += (|D| - J) / 16). O estimador da
+    RFC 3550 é uma média exponencial sem janela: não se decompõe em fatias, por isso as
+    janelas usam o IPDV médio. Memória constante, seja qual for a duração do monitoramento.
+    """
+
+    WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+    def __init__(self):
+        self.windows = {name: RollingWindow(span) for name, span in self.WINDOWS.items()}
+        self.jitter_rfc3550 = 0.0
+        self._last_rtt = None
+
+    def add(self, rtt, now=None):
+        now = time.monotonic() if now is None else now
+        diff = None
+        if rtt is not None:
+            if self._last_rtt is not None:
+                diff = abs(rtt - self._last_rtt)
+                self.jitter_rfc3550 += (diff - self.jitter_rfc3550) / 16
+            self._last_rtt = rtt
+        for w in self.windows.values():
+            w.add(now, rtt, diff)
+
+    def snapshot(self, window="1m", now=None):
+        now = time.monotonic() if now is None else now
+        return self.windows[window].snapshot(now)
+
+
+# Limites típicos para VoIP/Jogos (ms e %): acima de *_WARN é "atenção", a partir de *_LIMIT é ruim
+LATENCY_WARN, LATENCY_LIMIT = 50, 150
+LOSS_WARN, LOSS_LIMIT = 1, 5
+JITTER_WARN, JITTER_LIMIT = 10, 30
+
+def _quality_green(avg_lat, loss_rate, jitter):
+    """True quando nenhum limite de _get_quality_alert é ultrapassado."""
+    return avg_lat <= LATENCY_WARN and loss_rate <= LOSS_WARN and jitter <= JITTER_WARN
+
+def _get_quality_alert(avg_lat, loss_rate, jitter):
+    """Retorna uma string de alerta de qualidade de conexão baseado em limites típicos."""
+    alerts = []
+
+    if loss_rate >= LOSS_LIMIT:
+        alerts.append(f"[bold red]ALERTA: Perda de Pacotes Alta ({loss_rate:.1f}%)![/bold red]")
+    elif loss_rate > LOSS_WARN:
+        alerts.append(f"[yellow]Atenção: Perda de Pacotes Moderada ({loss_rate:.1f}%).[/yellow]")
+
+    if avg_lat >= LATENCY_LIMIT:
+        alerts.append(f"[bold red]ALERTA: Latência Muito Alta ({avg_lat:.1f}ms)![/bold red]")
+    elif avg_lat > LATENCY_WARN:
+        alerts.append(f"[yellow]Atenção: Latência Elevada ({avg_lat:.1f}ms).[/yellow]")
+
+    if jitter >= JITTER_LIMIT:
+        alerts.append(f"[bold red]ALERTA: Jitter Extremo ({jitter:.1f}ms)![/bold red]")
+    elif jitter > JITTER_WARN:
+        alerts.append(f"[yellow]Atenção: Jitter Moderado ({jitter:.1f}ms).[/yellow]")
+        
+    if not alerts:
+        alerts.append("[green]Qualidade de Conexão Ótima.[/green]")
+        
+    return " | ".join(alerts)
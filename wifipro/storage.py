@@ -0,0 +1,412 @@
+"""Armazenamento binário de amostras (monitor --record) e consulta (history)."""
+
+import time
+import re
+import struct
+import json
+import math
+from datetime import datetime
+
+from .common import console, _parse_span, _parse_when, ROOT
+from .stats import QuantileSketch
+
+# --- Armazenamento binário de amostras (monitor --record / history) ---
+
+SAMPLES = ROOT / "samples"
+# Registro de largura fixa: timestamp_us (int64), rtt_ms (float32), target_id (uint16), perdido (uint8)
+SAMPLE_RECORD = struct.Struct("<qfHBx")
+SAMPLE_BATCH = 256  # registros por escrita em disco
+# Resumos em <dia>.sum, ao lado do <dia>.bin, gravados em blocos. Cada bloco diz qual trecho
+# do .bin (em bytes) resume e em que largura (minuto ou hora), e traz um registro por faixa
+# de tempo desse trecho, seguido das faixas do sketch (índices int16 e contagens uint32)
+ROLLUP_MINUTE_US = 60_000_000
+ROLLUP_HOUR_US = 3_600_000_000
+ROLLUP_CHUNK = struct.Struct("<qqqII")     # início e fim no .bin, largura_us, registros, bytes
+ROLLUP_ENTRY = struct.Struct("<qIIdffH")   # início_us, amostras, perdidas, soma, mín, máx, faixas
+
+
+def _target_ids():
+    """Lê (ou inicia) o mapa alvo -> id numérico gravado nos registros."""
+    path = SAMPLES / "targets.json"
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {}
+
+
+def _sample_file(target, day):
+    """Arquivo de um alvo em um dia (`day` no formato AAAAMMDD)."""
+    return SAMPLES / re.sub(r"[^\w.-]", "_", target) / f"{day}.bin"
+
+
+class SampleLog:
+    """
+    Log binário append-only de amostras do monitor: um arquivo por alvo por dia,
+    registros de largura fixa gravados em lotes. Cada lote também vira um bloco de
+    resumos por minuto no .sum do dia; quando o dia termina (ou no close) o .sum é
+    refeito a partir do .bin com resumos por hora e por minuto (ver _compact_rollups).
+    """
+
+    def __init__(self, batch=SAMPLE_BATCH):
+        SAMPLES.mkdir(exist_ok=True)
+        self.batch = batch
+        self._ids = _target_ids()
+        self._pending = {}
+        self._days = {}  # alvo -> último dia gravado
+
+    def _id(self, target):
+        if target not in self._ids:
+            self._ids[target] = len(self._ids) + 1
+            (SAMPLES / "targets.json").write_text(json.dumps(self._ids, ensure_ascii=False), encoding="utf-8")
+        return self._ids[target]
+
+    def append(self, target, samples):
+        """Enfileira amostras (timestamp_us, rtt_ms | None); grava quando o lote enche."""
+        tid = self._id(target)
+        for ts_us, rtt in samples:
+            day = datetime.fromtimestamp(ts_us / 1e6).strftime("%Y%m%d")
+            previous = self._days.get(target)
+            if previous != day:
+                self._days[target] = day
+                if previous is not None and previous < day:
+                    # Virou o dia: o arquivo de ontem não recebe mais nada
+                    self._flush((target, previous))
+                    _compact_rollups(_sample_file(target, previous))
+            buf = self._pending.setdefault((target, day), [])
+            buf.append(SAMPLE_RECORD.pack(ts_us, rtt if rtt is not None else 0.0, tid, rtt is None))
+            if len(buf) >= self.batch:
+                self._flush((target, day))
+
+    def _flush(self, key):
+        buf = self._pending.pop(key, None)
+        if not buf:
+            return
+        path = _sample_file(*key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = b"".join(buf)
+        with open(path, "ab", buffering=0) as f:
+            f.write(data)
+            end = f.tell()
+        # O resumo vem depois dos registros: se a gravação parar no meio, o trecho sem
+        # bloco no .sum continua sendo lido direto do .bin
+        acc = {}
+        _fold_samples(acc, _iter_records(data, 0, len(data) // SAMPLE_RECORD.size), ROLLUP_MINUTE_US)
+        with open(path.with_suffix(".sum"), "ab") as f:
+            f.write(_pack_rollups(end - len(data), end, ROLLUP_MINUTE_US, acc))
+
+    def close(self):
+        for key in list(self._pending):
+            self._flush(key)
+        for target, day in self._days.items():
+            _compact_rollups(_sample_file(target, day))
+
+
+def _sample_days(target, start_us, end_us):
+    """Arquivos diários (.bin) de um alvo que podem ter amostras em [start_us, end_us)."""
+    day = datetime.fromtimestamp(start_us / 1e6).date()
+    last = datetime.fromtimestamp(end_us / 1e6).date()
+    while day <= last:
+        path = _sample_file(target, day.strftime("%Y%m%d"))
+        day = day.fromordinal(day.toordinal() + 1)
+        if path.exists() and path.stat().st_size >= SAMPLE_RECORD.size:
+            yield path
+
+
+def _bound(buf, n, ts):
+    """Índice do primeiro registro de `buf` com timestamp >= `ts` (busca binária)."""
+    size = SAMPLE_RECORD.size
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if struct.unpack_from("<q", buf, mid * size)[0] < ts:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _iter_records(buf, lo, hi):
+    """Itera (timestamp_us, rtt_ms | None) dos registros [lo, hi) de `buf`."""
+    size = SAMPLE_RECORD.size
+    view = memoryview(buf)[lo * size:hi * size]
+    try:
+        for ts_us, rtt, _, lost in SAMPLE_RECORD.iter_unpack(view):
+            yield ts_us, None if lost else rtt
+    finally:
+        view.release()
+
+
+def _read_samples(target, start_us, end_us):
+    """
+    Itera (timestamp_us, rtt_ms | None) de um alvo no intervalo [start_us, end_us).
+    Cada arquivo diário é mapeado com mmap e os limites são achados por busca binária.
+    """
+    import mmap
+    for path in _sample_days(target, start_us, end_us):
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            n = len(mm) // SAMPLE_RECORD.size
+            yield from _iter_records(mm, _bound(mm, n, start_us), _bound(mm, n, end_us))
+
+
+def _pack_rollups(start, end, width_us, acc):
+    """Bloco do .sum para o trecho [start, end) do .bin, a partir de um acumulador por faixa de `width_us`."""
+    parts = []
+    for key, (count, lost, total, lo, hi, sketch) in sorted(acc.items()):
+        bins = sketch.bins
+        parts.append(ROLLUP_ENTRY.pack(key, count, lost, total, lo, hi, len(bins)))
+        parts.append(struct.pack(f"<{len(bins)}h{len(bins)}I", *bins, *bins.values()))
+    payload = b"".join(parts)
+    return ROLLUP_CHUNK.pack(start, end, width_us, len(acc), len(payload)) + payload
+
+
+def _read_rollups(path):
+    """
+    Cabeçalhos dos blocos de um .sum: [(início, fim no .bin, largura_us, registros, dados, posição)].
+    Os registros só são decodificados sob demanda (_rollup_entries). Um bloco truncado no fim
+    (gravação interrompida) é ignorado e o trecho fica para a leitura bruta.
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return []
+    chunks = []
+    off = 0
+    while off + ROLLUP_CHUNK.size <= len(data):
+        start, end, width, n, nbytes = ROLLUP_CHUNK.unpack_from(data, off)
+        off += ROLLUP_CHUNK.size
+        if off + nbytes > len(data):
+            break
+        chunks.append((start, end, width, n, data, off))
+        off += nbytes
+    return chunks
+
+
+def _rollup_entries(n, data, off):
+    """Itera (início_us, amostras, perdidas, soma, mín, máx, índices, contagens) de um bloco."""
+    for _ in range(n):
+        key, count, lost, total, lo, hi, nbins = ROLLUP_ENTRY.unpack_from(data, off)
+        off += ROLLUP_ENTRY.size
+        bins = struct.unpack_from(f"<{nbins}h{nbins}I", data, off)
+        off += 6 * nbins
+        yield key, count, lost, total, lo, hi, bins[:nbins], bins[nbins:]
+
+
+def _compact_rollups(path):
+    """
+    Refaz o .sum de um dia a partir do .bin inteiro: um bloco por hora e outro por minuto,
+    ambos cobrindo o arquivo todo. Troca atômica; blocos que outro processo anexar nesse meio
+    tempo se perdem, e o trecho correspondente volta a ser lido direto do .bin.
+    """
+    import mmap
+    import os
+    if not path.exists() or path.stat().st_size < SAMPLE_RECORD.size:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        n = len(mm) // SAMPLE_RECORD.size
+        minutes = {}
+        _fold_samples(minutes, _iter_records(mm, 0, n), ROLLUP_MINUTE_US)
+    end = n * SAMPLE_RECORD.size
+    hours = {}
+    for key, (count, lost, total, lo, hi, sketch) in minutes.items():
+        _merge_rollup(hours, key - key % ROLLUP_HOUR_US, count, lost, total, lo, hi, sketch.bins, sketch.bins.values())
+    tmp = path.with_suffix(".sum.tmp")
+    tmp.write_bytes(_pack_rollups(0, end, ROLLUP_HOUR_US, hours) + _pack_rollups(0, end, ROLLUP_MINUTE_US, minutes))
+    os.replace(tmp, path.with_suffix(".sum"))
+
+
+def _merge_rollup(acc, key, count, lost, total, lo, hi, idx, cnt):
+    """Soma um resumo já agregado (minuto ou hora) ao acumulador, na faixa `key`."""
+    a = acc.get(key)
+    if a is None:
+        a = acc[key] = [0, 0, 0.0, math.inf, -math.inf, QuantileSketch()]
+    a[0] += count
+    a[1] += lost
+    a[2] += total
+    if lo < a[3]:
+        a[3] = lo
+    if hi > a[4]:
+        a[4] = hi
+    bins = a[5].bins
+    for i, c in zip(idx, cnt):
+        bins[i] = bins.get(i, 0) + c
+
+
+def _fold_samples(acc, samples, bucket_us=None, offset_us=0):
+    """Soma amostras ao acumulador {inicio_bucket_us: [count, perdidas, soma, mín, máx, sketch]}."""
+    # Laço quente: o índice do sketch é calculado em linha para evitar chamadas por amostra
+    log, ceil = math.log, math.ceil
+    log_gamma, qmin, qmax = QuantileSketch._LOG_GAMMA, QuantileSketch.QMIN, QuantileSketch.QMAX
+    for ts_us, rtt in samples:
+        key = ts_us - (ts_us + offset_us) % bucket_us if bucket_us else 0
+        a = acc.get(key)
+        if a is None:
+            a = acc[key] = [0, 0, 0.0, math.inf, -math.inf, QuantileSketch()]
+        a[0] += 1
+        if rtt is None:
+            a[1] += 1
+            continue
+        a[2] += rtt
+        if rtt < a[3]:
+            a[3] = rtt
+        if rtt > a[4]:
+            a[4] = rtt
+        bins = a[5].bins
+        i = ceil(log(qmin if rtt < qmin else qmax if rtt > qmax else rtt) / log_gamma)
+        bins[i] = bins.get(i, 0) + 1
+
+
+def _summarize(acc):
+    """Resumo por bucket (count, loss %, mean, min, max, p50/p95/p99), em ordem de tempo."""
+    out = {}
+    for key, (count, lost, total, lo, hi, sketch) in sorted(acc.items()):
+        received = count - lost
+        sketch.count = received
+        out[key] = {
+            "count": count,
+            "loss": 100.0 * lost / count,
+            "mean": total / received if received else None,
+            "min": lo if received else None,
+            "max": hi if received else None,
+            "p50": sketch.quantile(0.50),
+            "p95": sketch.quantile(0.95),
+            "p99": sketch.quantile(0.99),
+        }
+    return out
+
+
+def _local_offset_us(when):
+    """Deslocamento do fuso local (UTC-3 → -3h) em µs no instante `when` (datetime ingênuo, local)."""
+    return int(when.astimezone().utcoffset().total_seconds() * 1_000_000)
+
+
+def _aggregate_samples(samples, bucket_us=None, offset_us=0):
+    """
+    Agrega amostras em {inicio_bucket_us: resumo}. Sem `bucket_us`, um único bucket (chave 0).
+    `offset_us` é o fuso local (_local_offset_us): as faixas começam na meia-noite/hora cheia
+    local, não na do UTC. O resumo tem count, loss (%), mean, min, max e p50/p95/p99.
+    """
+    acc = {}
+    _fold_samples(acc, samples, bucket_us, offset_us)
+    return _summarize(acc)
+
+
+def _query_samples(target, start_us, end_us, bucket_us=None, offset_us=0):
+    """
+    Mesmo resultado de _aggregate_samples(_read_samples(...)) sem decodificar o período todo:
+    horas e minutos inteiros saem dos resumos (.sum); só as bordas (minutos parciais) e os
+    trechos do .bin sem bloco de resumo (arquivos antigos, gravação interrompida) são lidos
+    registro a registro. Uma largura de resumo só é usada se cada faixa dela cabe inteira
+    num bucket (bucket e fuso múltiplos da largura); senão, cai para a menor ou para o bruto.
+    """
+    import mmap
+
+    def usable(width):
+        return not bucket_us or (bucket_us % width == 0 and offset_us % width == 0)
+
+    def bucket(key):
+        return key - (key + offset_us) % bucket_us if bucket_us else 0
+
+    acc = {}
+    first = -(-start_us // ROLLUP_MINUTE_US) * ROLLUP_MINUTE_US  # início do primeiro minuto inteiro
+    last = end_us // ROLLUP_MINUTE_US * ROLLUP_MINUTE_US         # fim do último minuto inteiro
+    if first >= last or not usable(ROLLUP_MINUTE_US):
+        _fold_samples(acc, _read_samples(target, start_us, end_us), bucket_us, offset_us)
+        return _summarize(acc)
+
+    size = SAMPLE_RECORD.size
+    for path in _sample_days(target, start_us, end_us):
+        # Blocos por trecho do .bin: {(início, fim): {largura: (registros, dados, posição)}}
+        ranges = {}
+        for start, end, width, n, data, off in _read_rollups(path.with_suffix(".sum")):
+            ranges.setdefault((start, end), {})[width] = (n, data, off)
+        # Só vale trecho com resumo por minuto (as horas sozinhas não respondem às bordas);
+        # trechos sobrepostos (outro processo gravando durante a compactação) contariam em dobro
+        covered, done = [], 0
+        for start, end in sorted(ranges):
+            if start >= done and ROLLUP_MINUTE_US in ranges[start, end]:
+                covered.append((start, end))
+                done = end
+
+        for levels in (ranges[r] for r in covered):
+            hours, partial = set(), True
+            if ROLLUP_HOUR_US in levels and usable(ROLLUP_HOUR_US):
+                partial = False
+                for key, *entry in _rollup_entries(*levels[ROLLUP_HOUR_US]):
+                    if first <= key and key + ROLLUP_HOUR_US <= last:
+                        hours.add(key)
+                        _merge_rollup(acc, bucket(key), *entry)
+                    else:
+                        partial = True
+            if partial and ROLLUP_MINUTE_US in levels:
+                for key, *entry in _rollup_entries(*levels[ROLLUP_MINUTE_US]):
+                    if first <= key < last and key - key % ROLLUP_HOUR_US not in hours:
+                        _merge_rollup(acc, bucket(key), *entry)
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            n = len(mm) // size
+            lo, hi = _bound(mm, n, start_us), _bound(mm, n, end_us)
+            mid_lo, mid_hi = _bound(mm, n, first), _bound(mm, n, last)
+            # Bordas (minutos parciais) e, no miolo, os trechos sem resumo
+            raw = [(lo, mid_lo), (mid_hi, hi)]
+            pos = mid_lo
+            for start, end in covered:
+                if start // size >= mid_hi:
+                    break
+                if start // size > pos:
+                    raw.append((pos, start // size))
+                pos = max(pos, end // size)
+            raw.append((pos, mid_hi))
+            for a, b in raw:
+                if a < b:
+                    _fold_samples(acc, _iter_records(mm, a, b), bucket_us, offset_us)
+    return _summarize(acc)
+
+
+def cmd_history(args):
+    if args.list:
+        ids = _target_ids()
+        if not ids:
+            console.print("[yellow]Nenhuma amostra gravada (use monitor --record).[/yellow]")
+        for target in ids:
+            days = sorted(p.stem for p in _sample_file(target, "x").parent.glob("*.bin"))
+            span = f"{days[0]} → {days[-1]}" if days else "sem dados"
+            console.print(f"- {target} ({span})")
+        return 0
+
+    if not args.target:
+        console.print("[red]Informe o alvo ou use --list.[/red]")
+        return 2
+
+    now = datetime.now()
+    since = _parse_when(args.since, datetime.fromtimestamp(now.timestamp() - 86400))
+    until = _parse_when(args.until, now)
+    bucket = _parse_span(args.bucket) if args.bucket else None
+
+    t0 = time.perf_counter()
+    rows = _query_samples(args.target, int(since.timestamp() * 1e6), int(until.timestamp() * 1e6),
+                          bucket_us=bucket * 1_000_000 if bucket else None, offset_us=_local_offset_us(since))
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    if not rows:
+        console.print(f"[yellow]Sem amostras de {args.target} no período.[/yellow]")
+        return 1
+
+    fmt = lambda v: "-" if v is None else f"{v:.1f}"
+    header = ["Início", "Amostras", "Perda %", "Média", "Mín", "Máx", "p50", "p95", "p99"]
+    lines = []
+    for key, r in rows.items():
+        label = datetime.fromtimestamp(key / 1e6).strftime("%Y-%m-%d %H:%M") if bucket else f"{since:%Y-%m-%d %H:%M} → {until:%Y-%m-%d %H:%M}"
+        lines.append([label, str(r["count"]), f"{r['loss']:.1f}", fmt(r["mean"]), fmt(r["min"]),
+                      fmt(r["max"]), fmt(r["p50"]), fmt(r["p95"]), fmt(r["p99"])])
+    try:
+        from rich.table import Table
+        table = Table(title=f"Histórico — {args.target} ({elapsed_ms:.0f}ms)")
+        for col in header:
+            table.add_column(col)
+        for line in lines:
+            table.add_row(*line)
+        console.print(table)
+    except ImportError:
+        console.print(" | ".join(header))
+        for line in lines:
+            console.print(" | ".join(line))
+    return 0
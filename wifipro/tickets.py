@@ -0,0 +1,418 @@
+"""Tickets: base SQLite, templates de e-mail e os comandos ticket open/list/view/import/mail-worker."""
+
+import sys
+import os
+import time
+import re
+import json
+from datetime import datetime
+from pathlib import Path
+
+from .common import console, _load_env, _parse_when, ROOT, TEMPLATES
+from .trace import span
+
+TICKETS_DB = ROOT / "tickets" / "tickets_db.json"  # formato antigo, apenas para importação
+TICKETS_SQLITE = Path(os.getenv("TICKETS_SQLITE") or ROOT / "tickets" / "tickets.db")
+
+TICKET_FIELDS = ("id", "client_name", "client_email", "summary", "category", "created_at", "status")
+
+# Versão do esquema gravada em PRAGMA user_version; aumente ao mudar TICKETS_SCHEMA
+SCHEMA_VERSION = 1
+
+TICKETS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id TEXT PRIMARY KEY,
+    client_name TEXT NOT NULL,
+    client_email TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    category TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+-- Filtro + ordem de listagem no mesmo índice: sem B-tree temporária no ORDER BY
+DROP INDEX IF EXISTS idx_tickets_email;
+DROP INDEX IF EXISTS idx_tickets_status;
+CREATE INDEX IF NOT EXISTS idx_tickets_email_created ON tickets(client_email, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON tickets(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets(created_at, id);
+CREATE TABLE IF NOT EXISTS mail_queue (
+    id INTEGER PRIMARY KEY,
+    protocol TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    to_addr TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    html_body TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (protocol, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_mail_due ON mail_queue(status, next_attempt_at);
+"""
+
+def _db():
+    """
+    Abre o banco SQLite de tickets (modo WAL, com índices por id, e-mail, status e data).
+    Na primeira abertura importa o antigo tickets_db.json, se existir.
+    """
+    import sqlite3
+    TICKETS_SQLITE.parent.mkdir(exist_ok=True)
+    fresh = not TICKETS_SQLITE.exists()
+    with span("db.open"):
+        conn = sqlite3.connect(TICKETS_SQLITE, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Esquema e migrações só rodam quando o banco está numa versão anterior
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            with span("db.migrate"):
+                conn.executescript(f"BEGIN IMMEDIATE; {TICKETS_SCHEMA} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;")
+    if fresh and TICKETS_DB.exists():
+        with span("db.import_json"):
+            n = _import_json(conn, TICKETS_DB)
+        console.print(f"[cyan]{n} ticket(s) importado(s) de {TICKETS_DB.name}.[/cyan]")
+    return conn
+
+def _import_json(conn, path):
+    """Importa tickets do formato JSON antigo ({"tickets": [...]}); ignora ids já existentes."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return 0
+    rows = [tuple(t.get(f, "") for f in TICKET_FIELDS) for t in data.get("tickets", []) if t.get("id")]
+    with conn:
+        before = conn.total_changes
+        conn.executemany(f"INSERT OR IGNORE INTO tickets ({', '.join(TICKET_FIELDS)}) VALUES ({', '.join('?' * len(TICKET_FIELDS))})", rows)
+        return conn.total_changes - before
+
+def _insert_ticket(ticket, conn=None):
+    """
+    Grava o ticket numa transação atômica; gera novo protocolo em caso de colisão. Retorna o id.
+    Usa `conn` quando informado (sem fechá-lo); senão abre e fecha uma conexão própria.
+    """
+    import sqlite3
+    own = conn is None
+    if own:
+        conn = _db()
+    try:
+        for _ in range(10):
+            try:
+                with span("db.insert_ticket"), conn:
+                    conn.execute(f"INSERT INTO tickets ({', '.join(TICKET_FIELDS)}) VALUES ({', '.join('?' * len(TICKET_FIELDS))})",
+                                 tuple(ticket[f] for f in TICKET_FIELDS))
+                return ticket["id"]
+            except sqlite3.IntegrityError:
+                ticket["id"] = _gen_protocol()
+        raise RuntimeError("Não foi possível gerar um protocolo único.")
+    finally:
+        if own:
+            conn.close()
+
+def _get_ticket(tid):
+    """Busca um ticket pelo id (chave primária)."""
+    conn = _db()
+    try:
+        with span("db.get_ticket"):
+            row = conn.execute("SELECT * FROM tickets WHERE id = ?", (tid,)).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+def _iter_tickets(status=None, category=None, since=None, client=None, limit=None, offset=0, after=None):
+    """
+    Itera os tickets em ordem de criação, aplicando filtros e paginação no próprio SQLite.
+    `after` é um cursor (id do último ticket já exibido) para paginação por chave.
+    As linhas são lidas sob demanda, então a primeira chega sem varrer a base inteira.
+    """
+    where, params = [], []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    if since:
+        where.append("created_at >= ?")
+        params.append(since)
+    if client:
+        if "@" in client:
+            where.append("client_email = ?")
+            params.append(client)
+        else:
+            where.append("client_name LIKE ?")
+            params.append(f"%{client}%")
+    if after:
+        where.append("(created_at, id) > (SELECT created_at, id FROM tickets WHERE id = ?)")
+        params.append(after)
+
+    sql = "SELECT * FROM tickets"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at, id"
+    if limit is not None or offset:
+        sql += " LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset or 0]
+
+    conn = _db()
+    try:
+        # Só a consulta até a primeira linha; o restante é consumido sob demanda
+        with span("db.query_tickets", where=" AND ".join(where) or None):
+            cur = conn.execute(sql, params)
+        for row in cur:
+            yield dict(row)
+    finally:
+        conn.close()
+
+def _gen_protocol(prefix=None):
+    import random
+    import string
+    prefix = prefix or os.getenv("PROTOCOL_PREFIX", "OKA")
+    day = datetime.now().strftime("%Y%m%d") # Formato sem hífens para simplificar
+    suffix = "".join(random.choices(string.ascii_uppercase + string.digits, k=4))
+    return f"{prefix}-{day}-{suffix}"
+
+# --- Templates de e-mail (compilados uma vez, cache por mtime) ---
+
+TEMPLATE_VARS = frozenset({"PROTOCOL", "COMPANY_NAME", "CLIENT_NAME", "CLIENT_EMAIL", "SUMMARY", "CATEGORY", "CREATED_AT"})
+
+class CompiledTemplate:
+    """
+    Template `${VAR}` pré-processado: os trechos literais e as variáveis já ficam separados,
+    então a renderização é um único join. Variáveis fora de TEMPLATE_VARS são rejeitadas
+    na compilação; em templates .html os valores são escapados.
+    """
+
+    PLACEHOLDER = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+    def __init__(self, text, name="<template>", html=False):
+        self.name = name
+        self.html = html
+        self._literals = []
+        self._names = []
+        pos = 0
+        for m in self.PLACEHOLDER.finditer(text):
+            if m.group(1) not in TEMPLATE_VARS:
+                raise ValueError(f"Variável desconhecida ${{{m.group(1)}}} em {name}")
+            self._literals.append(text[pos:m.start()])
+            self._names.append(m.group(1))
+            pos = m.end()
+        self._literals.append(text[pos:])
+
+    def render(self, mapping):
+        import html
+        try:
+            values = [str(mapping[n]) for n in self._names]
+        except KeyError as e:
+            raise ValueError(f"Valor ausente para ${{{e.args[0]}}} em {self.name}") from None
+        if self.html:
+            values = [html.escape(v) for v in values]
+        out = [self._literals[0]]
+        for value, literal in zip(values, self._literals[1:]):
+            out.append(value)
+            out.append(literal)
+        return "".join(out)
+
+    def render_many(self, mappings):
+        """Renderiza um lote (ex: notificação em massa) com o mesmo template compilado, num único span."""
+        with span("template.render", template=self.name, count=len(mappings)):
+            return [self.render(m) for m in mappings]
+
+_TEMPLATE_CACHE = {}
+
+def _load_template(path):
+    """Template compilado de `path` (recompila só se o mtime mudar); None se não existir."""
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        _TEMPLATE_CACHE.pop(path, None)
+        return None
+    cached = _TEMPLATE_CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with span("template.compile", template=path.name):
+        tpl = CompiledTemplate(path.read_text(encoding="utf-8"), name=path.name, html=path.suffix == ".html")
+    _TEMPLATE_CACHE[path] = (mtime, tpl)
+    return tpl
+
+def _render_email_batch(name, mappings, default_subject):
+    """
+    Renderiza `templates/<name>.txt` (e `.html`, se existir) para vários tickets.
+    Retorna uma lista de (assunto, corpo, html | None); `default_subject(mapping)` é usado
+    quando a primeira linha não traz "Assunto:".
+    """
+    mappings = list(mappings)
+    txt = _load_template(TEMPLATES / f"{name}.txt")
+    html_tpl = _load_template(TEMPLATES / f"{name}.html")
+    texts = txt.render_many(mappings)
+    htmls = html_tpl.render_many(mappings) if html_tpl else [None] * len(mappings)
+    out = []
+    for mapping, text, html_body in zip(mappings, texts, htmls):
+        # Extrai o assunto (primeira linha que contenha "Assunto:")
+        first_line, _, body_rest = text.partition("\n")
+        subject = first_line.replace("Assunto:", "").strip() if "Assunto:" in first_line else default_subject(mapping)
+        out.append((subject, body_rest.strip(), html_body))
+    return out
+
+
+def cmd_ticket_open(args):
+    # A fila de e-mails só é carregada por quem envia (open / mail-worker), não por list/view
+    from .mail import _deliver_mail_queue, _enqueue_mail
+    _load_env()
+    company = os.getenv("COMPANY_NAME", "Okamoto Security Labs")
+    protocol = _gen_protocol()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    if not args.client_name or not args.client_email or not args.summary:
+        console.print("[red]--client-name, --client-email e --summary são obrigatórios[/red]")
+        return 2
+
+    # Verifica o mutually exclusive group
+    if args.physical and args.logical:
+        console.print("[red]Use apenas --physical OU --logical, não ambos.[/red]")
+        return 2
+        
+    category = "Físico" if args.physical else "Lógico" # Já garantido que um foi passado
+
+    ticket = {
+        "id": protocol,
+        "client_name": args.client_name,
+        "client_email": args.client_email,
+        "summary": args.summary,
+        "category": category,
+        "created_at": created_at,
+        "status": "Recebido"
+    }
+
+    # Uma conexão só para gravar o ticket e enfileirar/enviar os e-mails
+    conn = _db()
+    try:
+        protocol = _insert_ticket(ticket, conn)
+
+        console.print(f"[green]Ticket criado:[/green] {protocol} — {category}")
+
+        if args.no_email:
+            console.print("[cyan]Envio de e-mails desativado (--no-email).[/cyan]")
+            return 0
+
+        # Mapeamento de variáveis para templates
+        mapping = {
+            "PROTOCOL": protocol,
+            "COMPANY_NAME": company,
+            "CLIENT_NAME": args.client_name,
+            "CLIENT_EMAIL": args.client_email,
+            "SUMMARY": args.summary,
+            "CATEGORY": category,
+            "CREATED_AT": created_at,
+        }
+
+        # 1. E-mail para cliente / 2. E-mail para equipe de suporte
+        subject_client, body_client, client_html = _render_email_batch(
+            "email_client", [mapping], lambda m: f"Protocolo {m['PROTOCOL']} Recebido")[0]
+        subject_support, body_support, support_html = _render_email_batch(
+            "email_support", [mapping], lambda m: f"[{m['PROTOCOL']}] Novo Chamado ({m['CATEGORY']})")[0]
+
+        # Os e-mails vão para a fila; o envio fica com o `ticket mail-worker`
+        team = os.getenv("SUPPORT_TEAM_EMAIL")
+        _enqueue_mail(conn, protocol, "client", args.client_email, subject_client, body_client, client_html)
+        if team:
+            _enqueue_mail(conn, protocol, "support", team, subject_support, body_support, support_html)
+
+        if not args.send_now:
+            console.print(f"[blue]E-mails[/blue] enfileirados → Cliente: OK | Equipe: {'OK' if team else 'SKIP'} (envie com: ticket mail-worker)")
+            return 0
+
+        sent, deferred, dropped = _deliver_mail_queue(conn, protocol=protocol)
+    finally:
+        conn.close()
+    console.print(f"[blue]E-mails[/blue] → Enviados: {sent} | Reagendados: {deferred} | Descartados: {dropped}")
+    return 0
+
+def cmd_ticket_mail_worker(args):
+    from .mail import _deliver_mail_queue
+    conn = _db()
+    console.print(f"[bold blue]Worker de e-mail iniciado[/bold blue] (lote: {args.batch}, intervalo: {args.poll}s)")
+    try:
+        while True:
+            sent, deferred, dropped = _deliver_mail_queue(conn, batch=args.batch)
+            if sent or deferred or dropped:
+                console.print(f"[{datetime.now():%H:%M:%S}] Enviados: {sent} | Reagendados: {deferred} | Descartados: {dropped}")
+            if args.once:
+                break
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Worker encerrado pelo usuário.[/bold yellow]")
+    finally:
+        conn.close()
+    return 0
+
+def cmd_ticket_list(args):
+    since = None
+    if args.since:
+        since = _parse_when(args.since, None).strftime("%Y-%m-%d %H:%M:%S")
+    # Tabela é paginada por padrão; os formatos de streaming saem inteiros, linha a linha
+    limit = args.limit if args.limit is not None else (None if args.format else 50)
+    rows = _iter_tickets(status=args.status, category=args.category, since=since, client=args.client,
+                         limit=limit, offset=args.offset, after=args.cursor)
+
+    if args.format:
+        try:
+            if args.format == "jsonl":
+                for t in rows:
+                    sys.stdout.write(json.dumps(t, ensure_ascii=False) + "\n")
+            else:
+                import csv
+                writer = csv.DictWriter(sys.stdout, fieldnames=TICKET_FIELDS)
+                writer.writeheader()
+                for t in rows:
+                    writer.writerow(t)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # Saída cortada (ex: `| head`); evita o erro extra ao fechar o stdout
+            sys.stdout = open(os.devnull, "w")
+        return 0
+
+    tickets = list(rows)
+    if not tickets:
+        console.print("[yellow]Nenhum ticket.[/yellow]")
+        return 0
+    try:
+        from rich.table import Table
+        table = Table(title="Tickets")
+        for col in ["ID","Cliente","Categoria","Status","Criado em"]:
+            table.add_column(col)
+        for t in tickets:
+            table.add_row(t["id"], t["client_name"], t["category"], t["status"], t["created_at"])
+        console.print(table)
+    except Exception:
+        # Fallback se rich falhar ou for SimpleConsole
+        for t in tickets:
+            console.print(f"- {t['id']} | {t['client_name']} | {t['category']} | {t['status']} | {t['created_at']}")
+    if limit is not None and len(tickets) == limit:
+        console.print(f"[cyan]Próxima página:[/cyan] --cursor {tickets[-1]['id']}")
+    return 0
+
+def cmd_ticket_view(args):
+    t = _get_ticket(args.id)
+    if t:
+        # Saída em JSON puro (sem a rich): este comando é usado por scripts
+        print(json.dumps(t, ensure_ascii=False, indent=2))
+        return 0
+    console.print("[red]Ticket não encontrado.[/red]")
+    return 1
+
+def cmd_ticket_import(args):
+    path = Path(args.path) if args.path else TICKETS_DB
+    if not path.exists():
+        console.print(f"[red]Arquivo não encontrado:[/red] {path}")
+        return 1
+    conn = _db()
+    try:
+        n = _import_json(conn, path)
+    finally:
+        conn.close()
+    console.print(f"[green]{n} ticket(s) importado(s) de {path}.[/green]")
+    return 0
@@ -0,0 +1,134 @@
+"""Tracing opcional (--trace): spans com custo quase nulo quando desligado e exportação Chrome trace."""
+
+import sys
+import os
+import time
+import json
+from datetime import datetime
+from pathlib import Path
+
+
+class _NullSpan:
+    """Span vazio compartilhado: sem --trace, `span()` custa uma checagem de global."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **kw):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "t0")
+
+    def __init__(self, tracer, name, args):
+        self.tracer, self.name, self.args = tracer, name, args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def set(self, **kw):
+        """Anexa atributos conhecidos só no fim do trecho (ex: código de saída)."""
+        self.args.update(kw)
+
+    def __exit__(self, exc_type, exc, tb):
+        dur = time.perf_counter_ns() - self.t0
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.t0, dur, self.args)
+        return False
+
+class Tracer:
+    """
+    Coleta spans (nome, início, duração, thread, atributos) e exporta no formato
+    Chrome trace (abra em chrome://tracing ou ui.perfetto.dev) e como tabela-resumo.
+    """
+
+    def __init__(self):
+        import threading
+        self._thread = threading.current_thread
+        self.t0 = time.perf_counter_ns()
+        self.events = []   # list.append é atômico: seguro entre threads sem trava
+        self.threads = {}
+
+    def add(self, name, t0, dur, args):
+        th = self._thread()
+        self.threads.setdefault(th.ident, th.name)
+        self.events.append((name, t0, dur, th.ident, args))
+
+    def write(self, path):
+        pid = os.getpid()
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in self.threads.items()]
+        for name, t0, dur, tid, args in self.events:
+            trace.append({"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+                          "ts": (t0 - self.t0) / 1000, "dur": dur / 1000,
+                          "args": {k: v if isinstance(v, (int, float, bool)) or v is None else str(v) for k, v in args.items()}})
+        Path(path).write_text(json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"}), encoding="utf-8")
+
+    def summary(self):
+        """Linhas (nome, chamadas, total ms, média ms, máx ms) ordenadas pelo total."""
+        agg = {}
+        for name, _, dur, _, _ in self.events:
+            a = agg.setdefault(name, [0, 0, 0])
+            a[0] += 1
+            a[1] += dur
+            a[2] = max(a[2], dur)
+        rows = [(name, n, total / 1e6, total / n / 1e6, peak / 1e6) for name, (n, total, peak) in agg.items()]
+        return sorted(rows, key=lambda r: r[2], reverse=True)
+
+_TRACER = None
+
+def span(name, **args):
+    """Mede o trecho `with span(...)` quando --trace está ativo."""
+    if _TRACER is None:
+        return _NULL_SPAN
+    return _Span(_TRACER, name, args)
+
+def _wall_ms(rows):
+    """
+    Duração de referência do resumo: o span "command". Spans paralelos (run, probe) se
+    sobrepõem, então a soma das linhas só serve quando o "command" não existe.
+    """
+    wall = next((total for name, _, total, _, _ in rows if name == "command"), None)
+    return sum(r[2] for r in rows) if wall is None else wall
+
+def run_traced(args):
+    """Executa o comando com o tracing ligado; grava a linha do tempo e o resumo (stderr)."""
+    from .common import REPORTS
+    global _TRACER
+    _TRACER = Tracer()
+    command = " ".join(sys.argv[1:])
+    try:
+        with span("command", argv=command):
+            return args.func(args)
+    finally:
+        tracer, _TRACER = _TRACER, None
+        if args.trace_out:
+            path = Path(args.trace_out)
+        else:
+            REPORTS.mkdir(exist_ok=True)
+            path = REPORTS / f"trace-{datetime.now():%Y%m%d-%H%M%S}.json"
+        tracer.write(path)
+        rows = tracer.summary()
+        wall = _wall_ms(rows)
+        try:
+            from rich.console import Console
+            from rich.table import Table
+            table = Table(title=f"Trace — {wall:.1f}ms ({path})")
+            for col in ("Span", "Chamadas", "Total ms", "Média ms", "Máx ms", "% do comando"):
+                table.add_column(col, no_wrap=True)
+            for name, n, total, mean, peak in rows:
+                table.add_row(name, str(n), f"{total:.2f}", f"{mean:.2f}", f"{peak:.2f}",
+                              f"{100 * total / wall:.0f}%" if wall else "-")
+            Console(stderr=True).print(table)
+        except ImportError:
+            for name, n, total, mean, peak in rows:
+                sys.stderr.write(f"{name:24} {n:6} {total:10.2f} {mean:8.2f} {peak:8.2f}\n")